@@ -5,10 +5,34 @@ Parent class for all AI agents.
 Wraps the AIService and provides standard initialization.
 """
 
-from services.ai import AIService
+import hashlib
+import orjson
+from cachetools import LRUCache
+from services.ai import FAILURE_MESSAGE, UNAVAILABLE_MESSAGE, get_ai_service
 from typing import Optional
 
+
+def extract_json(text: str) -> dict:
+    """
+    Parse the JSON object embedded in an LLM response.
+    Only the outermost {...} span is decoded, so markdown fences or chatter around it are ignored.
+    Raises orjson.JSONDecodeError if no valid object is found (a bare list, string or number
+    counts as invalid, so callers' fallbacks still apply).
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    parsed = orjson.loads(text)
+    if not isinstance(parsed, dict):
+        raise orjson.JSONDecodeError(f"expected a JSON object, got {type(parsed).__name__}", text, 0)
+    return parsed
+
+
 class BaseAgent:
+    # Responses for recurring prompts, shared by all agents (key -> response text)
+    _response_cache: LRUCache = LRUCache(maxsize=2048)
+
     def __init__(self, model_name: str = "models/gemini-2.0-flash", system_instruction: Optional[str] = None):
         """
         Initialize the base agent.
@@ -17,7 +41,27 @@ class BaseAgent:
             model_name: The Gemini model to use (default: gemini-2.0-flash)
             system_instruction: Optional system prompt to guide behavior
         """
-        # Note: AIService currently hardcodes model, but we pass parameters for future extensibility
-        self.ai = AIService()
+        # Agents with the same model and system prompt share one AIService (and Gemini model)
+        self.ai = get_ai_service(model_name, system_instruction)
         self.model_name = model_name
         self.system_instruction = system_instruction
+
+    async def generate_cached(self, prompt: str, generation_config: Optional[dict] = None) -> str:
+        """Generate content, reusing the stored response if this exact prompt (and config) was seen before."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (self.model_name, self.system_instruction or "", prompt):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        if generation_config:
+            digest.update(orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS))
+        key = digest.hexdigest()
+
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = await self.ai.generate_content(prompt, generation_config=generation_config)
+        # Don't pin an outage message in the cache
+        if response not in (FAILURE_MESSAGE, UNAVAILABLE_MESSAGE):
+            self._response_cache[key] = response
+        return response
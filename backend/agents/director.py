@@ -5,23 +5,137 @@ Responsible for route planning and replanning based on user requests.
 Uses KnowledgeService to find new POIs.
 """
 
-from datetime import datetime
+import asyncio
+import hashlib
+import math
+import re
+import time
+import orjson
+from cachetools import TTLCache
 from services.knowledge import KnowledgeService
-from services.routing import haversine_distance, generate_route
-from agents.base import BaseAgent
-from models.state import POIStop, TourState
-from agents.base import BaseAgent
+from services.routing import EARTH_RADIUS_M, generate_route
+from agents.base import BaseAgent, extract_json
 from models.state import POIStop, TourState
 from typing import List, Optional
 from config import get_config
 
+__all__ = ["TourDirectorAgent"]
+
+# Shared config singleton; admin updates mutate it in place, so this stays current
+_CONFIG = get_config()
+
+# Short commands ("skip", "I want coffee") repeat across sessions; longer
+# messages are usually composite requests and aren't worth caching.
+INTENT_CACHE_MAX_MESSAGE_CHARS = 60
+
+
+def _rank_insertions(
+    node_lats: List[float],
+    node_lons: List[float],
+    cand_lats: List[float],
+    cand_lons: List[float]
+) -> tuple[List[int], List[float]]:
+    """
+    Find the cheapest insertion slot for every candidate along a chain of route nodes.
+    All coordinates are flat lists in radians. Slot j sits between node j and node j+1;
+    the last slot appends after the final node.
+    Returns (best_slots, added_costs_meters), aligned with the candidates.
+    """
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS_M
+    node_cos = [math.cos(lat) for lat in node_lats]
+    nodes = list(zip(node_lats, node_lons, node_cos))
+
+    # Existing legs don't depend on the candidate, so measure them once
+    legs = [
+        diameter * asin(sqrt(sin((lat2 - lat1) / 2)**2 + cos1 * cos2 * sin((lon2 - lon1) / 2)**2))
+        for (lat1, lon1, cos1), (lat2, lon2, cos2) in zip(nodes, nodes[1:])
+    ]
+
+    best_slots = []
+    min_costs = []
+    for c_lat, c_lon in zip(cand_lats, cand_lons):
+        c_cos = math.cos(c_lat)
+        # place->next for one slot is prev->place for the following one,
+        # so one distance per node covers every insertion point
+        to_node = [
+            diameter * asin(sqrt(sin((c_lat - lat) / 2)**2 + c_cos * n_cos * sin((c_lon - lon) / 2)**2))
+            for lat, lon, n_cos in nodes
+        ]
+
+        costs = [to_node[j] + to_node[j + 1] - leg for j, leg in enumerate(legs)]
+        costs.append(to_node[-1])  # Appending after the last node
+
+        best_slot = min(range(len(costs)), key=costs.__getitem__)
+        best_slots.append(best_slot)
+        min_costs.append(costs[best_slot])
+
+    return best_slots, min_costs
+
+
+def _query_covered_by(query: str, message: str) -> bool:
+    """True if every word of the parsed search query already appears in the user's message."""
+    message_words = set(re.findall(r"\w+", message.lower()))
+    return set(re.findall(r"\w+", query.lower())) <= message_words
+
+
+# Keyword rules for unambiguous short commands, checked before asking the LLM
+_SKIP_RE = re.compile(r"\b(skip|next stop|move on)\b", re.I)
+_END_RE = re.compile(r"\b(end|finish|stop) (the |this |my )?tour\b|\b(i'?m|we'?re) done\b", re.I)
+# Words that mean the user wants us to pick/add a place, or a new theme - leave those to the LLM
+_AMBIGUOUS_RE = re.compile(r"\b(add|pick|choose|instead|theme|show me)\b", re.I)
+# Negations flip the keyword rules ("don't skip this one", "not done yet") - also the LLM's call
+_NEGATION_RE = re.compile(r"\b(\w+n['’]t|dont|cant|wont|not|no|never)\b", re.I)
+# Everyday needs mapped onto the Places query the LLM would produce for them
+FAST_PLACE_QUERIES = {
+    "coffee": "coffee shop",
+    "cafe": "coffee shop",
+    "bathroom": "public restroom",
+    "restroom": "public restroom",
+    "toilet": "public restroom",
+    "pharmacy": "pharmacy",
+    "atm": "atm",
+}
+
+
+def _fast_intent(message: str) -> Optional[dict]:
+    """
+    Classify obvious short commands without an LLM call.
+    Returns an intent dict shaped like extract_replan_request's, or None if not confident.
+    """
+    if len(message) > INTENT_CACHE_MAX_MESSAGE_CHARS or _AMBIGUOUS_RE.search(message) or _NEGATION_RE.search(message):
+        return None
+
+    matches = []
+    if _SKIP_RE.search(message):
+        matches.append({"action": "skip_stop", "auto_add": False, "query": None, "reason": "keyword match"})
+    if _END_RE.search(message):
+        matches.append({"action": "end_tour", "auto_add": False, "query": None, "reason": "keyword match"})
+    place_queries = {FAST_PLACE_QUERIES[w] for w in re.findall(r"\w+", message.lower()) if w in FAST_PLACE_QUERIES}
+    for query in place_queries:
+        matches.append({"action": "find_place", "auto_add": False, "query": query, "reason": "keyword match"})
+
+    # Only trust the shortcut when exactly one rule fired
+    return matches[0] if len(matches) == 1 else None
+
+
 class TourDirectorAgent(BaseAgent):
+    # Parsed intents keyed by md5 of the normalized message, shared by all instances
+    _intent_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
     def __init__(self):
         super().__init__()
         self.knowledge_service = KnowledgeService()
 
     async def extract_replan_request(self, message: str) -> dict:
         """Parse what the user wants to do."""
+        cache_key = None
+        if len(message) <= INTENT_CACHE_MAX_MESSAGE_CHARS:
+            cache_key = hashlib.md5(message.lower().strip().encode()).hexdigest()
+            cached = self._intent_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
         prompt = f"""
         The user is on a walking tour and said: "{message}"
         
@@ -42,84 +156,71 @@ class TourDirectorAgent(BaseAgent):
         """
         response = await self.ai.generate_content(prompt)
         
-        # Parse JSON from response
-        import json
         try:
-            # Clean up response
-            response = response.strip()
-            if response.startswith("```"):
-                response = response.split("```")[1]
-                if response.startswith("json"):
-                    response = response[4:]
-            return json.loads(response)
-        except:
+            intent = extract_json(response)
+        except orjson.JSONDecodeError:
             return {"action": "find_place", "query": message, "reason": "parsed from message"}
 
+        if cache_key:
+            self._intent_cache[cache_key] = intent
+        return dict(intent)
+
     async def find_nearby_places(self, query: str, current_location: tuple) -> List[dict]:
         """Search for places matching user's request."""
         # Enable open_now=True to ensure we don't send them to closed places
         # Increase radius to 2000m (2km) for better selection
-        places = self.knowledge_service.search_places(query, current_location, radius_meters=1000, open_now=True)
+        # Async Places request, so it overlaps other awaits without tying up a thread
+        places = await self.knowledge_service.search_places_async(
+            query, current_location, radius_meters=1000, open_now=True
+        )
         
         # Filter for quality (Rating >= 2.0)
-        high_quality = [p for p in places if p.get("rating") and float(p["rating"]) >= 2.0]
+        # search_places already normalizes ratings to float, so no per-item cast here
+        high_quality = [p for p in places if (r := p.get("rating")) is not None and r >= 2.0]
         
-        if high_quality:
-            return high_quality
-            
-        return places
+        return high_quality or places
+
+    async def _speculative_search(self, message: str, current_location: tuple) -> Optional[List[dict]]:
+        """Search Places with the raw message while the intent is still being extracted."""
+        try:
+            return await self.find_nearby_places(message, current_location)
+        except Exception as e:
+            print(f"Speculative place search failed: {e}")
+            return None
 
     def rank_candidates_by_insertion(self, tour: TourState, candidates: List[dict]) -> List[tuple[dict, int, float]]:
         """
         Rank all candidates by "Cheapest Insertion" cost.
         Returns List of (candidate, best_index, added_cost_meters), sorted by cost asc.
         """
-        results = []
-
         # Current route stops (start checking from next stop onwards)
         stops = tour.route.stops
         start_idx = tour.route.current_stop_index + 1
-        
-        current_node = tour.route.current_stop
-        
-        for place in candidates:
-            place_coords = place["coordinates"]
-            best_idx = -1
-            min_added_cost = float('inf')
-            
-            # Check all possible insertion points
-            for i in range(start_idx, len(stops) + 1):
-                # Determine Previous Node
-                if i == 0:
-                    prev_coords = tour.current_location
-                else:
-                    prev_coords = stops[i-1].coordinates
-                    
-                # Determine Next Node
-                if i < len(stops):
-                    next_coords = stops[i].coordinates
-                else:
-                    next_coords = None
-                    
-                dist_prev_place = haversine_distance(prev_coords, place_coords)
-                
-                if next_coords:
-                    dist_place_next = haversine_distance(place_coords, next_coords)
-                    dist_prev_next = haversine_distance(prev_coords, next_coords)
-                    
-                    added_cost = dist_prev_place + dist_place_next - dist_prev_next
-                else:
-                    added_cost = dist_prev_place
-                
-                # User wants to minimize distance
-                total_heuristic_cost = added_cost
+        if start_idx > len(stops) or not candidates:
+            return []
 
-                if total_heuristic_cost < min_added_cost:
-                    min_added_cost = total_heuristic_cost
-                    best_idx = i
-            
-            if best_idx != -1:
-                results.append((place, best_idx, min_added_cost))
+        # Route nodes bounding the insertion points: the first is the stop (or
+        # location) before slot start_idx, then every remaining stop. The route
+        # keeps its stop coordinates as flat radian lists, so just slice them.
+        route = tour.route
+        if start_idx == 0:
+            first_lat, first_lon = tour.current_location
+            node_lats = [math.radians(first_lat)] + route.stop_lats_rad
+            node_lons = [math.radians(first_lon)] + route.stop_lons_rad
+        else:
+            node_lats = route.stop_lats_rad[start_idx - 1:]
+            node_lons = route.stop_lons_rad[start_idx - 1:]
+
+        best_slots, min_costs = _rank_insertions(
+            node_lats,
+            node_lons,
+            [math.radians(p["coordinates"][0]) for p in candidates],
+            [math.radians(p["coordinates"][1]) for p in candidates],
+        )
+        results = [
+            (place, start_idx + slot, cost)
+            for place, slot, cost in zip(candidates, best_slots, min_costs)
+        ]
 
         # Sort by cost (lowest added distance first)
         results.sort(key=lambda x: x[2])
@@ -131,8 +232,29 @@ class TourDirectorAgent(BaseAgent):
         """
         import uuid
         
-        # 1. Extract what user wants
-        intent = await self.extract_replan_request(user_request)
+        current_loc = tour.current_location or _CONFIG.default_start_location
+
+        # 1. Extract what user wants: keyword shortcut for obvious commands, otherwise
+        # ask the LLM while searching on the raw message in the meantime
+        intent = _fast_intent(user_request)
+        speculative_places = None
+        if intent is not None:
+            print(f"⚡ Fast intent for '{user_request}': {intent['action']} ({intent['query']})")
+        else:
+            speculative = asyncio.create_task(self._speculative_search(user_request, current_loc))
+            try:
+                intent = await self.extract_replan_request(user_request)
+            except BaseException:
+                speculative.cancel()
+                raise
+            print(f"🧠 LLM intent for '{user_request}': {intent.get('action')} ({intent.get('query')})")
+            # The raw-message search only helps a find_place whose query it already covers;
+            # for anything else, stop it as soon as the intent is known
+            parsed_query = intent.get("query", user_request)
+            if intent.get("action", "find_place") == "find_place" and parsed_query and _query_covered_by(parsed_query, user_request):
+                speculative_places = await speculative
+            else:
+                speculative.cancel()
         action = intent.get("action", "find_place")
         auto_add = intent.get("auto_add", False)
         query = intent.get("query", user_request)
@@ -150,10 +272,9 @@ class TourDirectorAgent(BaseAgent):
         if action == "change_theme":
             # REGENERATE ROUTE
             print(f"🔄 Regenerating route for theme: {query}")
-            current_loc = tour.current_location or get_config().default_start_location
             
             # Calculate remaining time
-            elapsed_minutes = (datetime.now() - tour.created_at).seconds / 60
+            elapsed_minutes = (time.monotonic() - tour.created_at_mono) / 60.0
             remaining_time = max(20, tour.preferences.tour_length - int(elapsed_minutes))
             
             # Generate new route segment
@@ -186,16 +307,18 @@ class TourDirectorAgent(BaseAgent):
                  result["message"] = f"I tried to find spots for '{query}' nearby, but came up empty. Let's stick to our current path for now."
 
         elif action == "find_place" and query:
-            # Search for nearby places
-            current_loc = tour.current_location or get_config().default_start_location
-            places = await self.find_nearby_places(query, current_loc)
+            # Reuse the speculative search if the raw message already covered the query
+            if speculative_places is not None:
+                places = speculative_places
+            else:
+                places = await self.find_nearby_places(query, current_loc)
             
             if places:
                 # Calculate costs for all options
                 ranked_candidates = self.rank_candidates_by_insertion(tour, places)
                 
                 if not ranked_candidates:
-                    result["message"] = f"I found some places, but couldn't fit them into your route."
+                    result["message"] = "I found some places, but couldn't fit them into your route."
                     return result
 
                 # INTERACTIVE FLOW
@@ -215,10 +338,9 @@ class TourDirectorAgent(BaseAgent):
                     )
                     
                     # Insert at the optimal index
-                    tour.route.stops.insert(insert_idx, new_stop)
+                    tour.route.add_stop(insert_idx, new_stop)
                     
                     # Determine message based on where it was inserted
-                    next_stop = tour.route.stops[insert_idx + 1] if insert_idx + 1 < len(tour.route.stops) else None
                     prev_stop = tour.route.stops[insert_idx - 1] if insert_idx > 0 else None
                     
                     location_desc = "up ahead"
@@ -4,11 +4,26 @@ Eval Agent
 Uses LLM-as-a-judge to evaluate RAG and Replanning responses.
 """
 
-import json
-from agents.base import BaseAgent
-from typing import Dict, Any
+import asyncio
+import hashlib
+import re
+import orjson
+from cachetools import LRUCache
+from agents.base import BaseAgent, extract_json
+from typing import Dict, Any, List
+
+# Max judge calls in flight during batch evaluation
+EVAL_BATCH_CONCURRENCY = 8
+
+# Score extractors for judge responses that aren't valid JSON
+_RE_FAITH = re.compile(r'"faithfulness":\s*(\d)')
+_RE_REL = re.compile(r'"answer_relevance":\s*(\d)')
+_RE_CTX = re.compile(r'"context_relevance":\s*(\d)')
 
 class EvalAgent(BaseAgent):
+    # Judging is idempotent, so reruns over the same (question, answer, context) reuse scores
+    _rag_cache: LRUCache = LRUCache(maxsize=1024)
+
     def __init__(self):
         super().__init__()
 
@@ -17,6 +32,11 @@ class EvalAgent(BaseAgent):
         Evaluate a RAG response for Faithfulness, Answer Relevance, and Context Relevance.
         Returns a dictionary of scores (0-5).
         """
+        cache_key = (question, answer, hashlib.md5(context.encode()).hexdigest())
+        cached = self._rag_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
         prompt = f"""
         You are an evaluator for an AI tour guide. Your job is to score the quality of an answer based on the provided context.
         
@@ -43,34 +63,23 @@ class EvalAgent(BaseAgent):
         
         response_text = await self.ai.generate_content(prompt)
         try:
-            # Clean up response
-            content = response_text.strip()
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            return json.loads(content)
-        except Exception as e:
+            scores = extract_json(response_text)
+        except orjson.JSONDecodeError as e:
             # Fallback for common JSON errors (like unescaped quotes in reasoning)
             print(f"Error parsing EvalAgent response: {e}")
-            try:
-                # Attempt to extract scores manually if JSON fails
-                import re
-                faith = re.search(r'"faithfulness":\s*(\d)', response_text)
-                rel = re.search(r'"answer_relevance":\s*(\d)', response_text)
-                ctx = re.search(r'"context_relevance":\s*(\d)', response_text)
-                return {
-                    "faithfulness": int(faith.group(1)) if faith else 0,
-                    "answer_relevance": int(rel.group(1)) if rel else 0,
-                    "context_relevance": int(ctx.group(1)) if ctx else 0,
-                    "reasoning": "Extracted via regex after JSON parse failure."
-                }
-            except:
-                return {
-                    "faithfulness": 0, "answer_relevance": 0, "context_relevance": 0,
-                    "reasoning": f"Failed parse: {e}"
-                }
+            # Attempt to extract scores manually if JSON fails
+            faith = _RE_FAITH.search(response_text)
+            rel = _RE_REL.search(response_text)
+            ctx = _RE_CTX.search(response_text)
+            return {
+                "faithfulness": int(faith.group(1)) if faith else 0,
+                "answer_relevance": int(rel.group(1)) if rel else 0,
+                "context_relevance": int(ctx.group(1)) if ctx else 0,
+                "reasoning": "Extracted via regex after JSON parse failure."
+            }
+
+        self._rag_cache[cache_key] = scores
+        return dict(scores)
 
     async def evaluate_replanning(self, preference: str, suggested_stop: str, reasoning_given: str) -> Dict[str, Any]:
         """
@@ -95,11 +104,35 @@ class EvalAgent(BaseAgent):
         
         response_text = await self.ai.generate_content(prompt)
         try:
-            cleaned_text = response_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(cleaned_text)
-        except Exception as e:
+            return extract_json(response_text)
+        except orjson.JSONDecodeError as e:
             print(f"Error parsing EvalAgent replanning response: {e}")
             return {
                 "constraint_satisfaction": 0,
                 "reasoning": "Failed to parse."
             }
+
+    async def evaluate_rag_batch(self, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate many RAG responses concurrently.
+        Each item holds evaluate_rag's keyword arguments (question, answer, context).
+        Returns scores in the same order as items.
+        """
+        return await self._run_batch(self.evaluate_rag, items)
+
+    async def evaluate_replanning_batch(self, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate many replanning suggestions concurrently.
+        Each item holds evaluate_replanning's keyword arguments (preference, suggested_stop, reasoning_given).
+        """
+        return await self._run_batch(self.evaluate_replanning, items)
+
+    async def _run_batch(self, evaluate, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Fan out judge calls, keeping at most EVAL_BATCH_CONCURRENCY in flight."""
+        sem = asyncio.Semaphore(EVAL_BATCH_CONCURRENCY)
+
+        async def _one(item: Dict[str, str]) -> Dict[str, Any]:
+            async with sem:
+                return await evaluate(**item)
+
+        return await asyncio.gather(*[_one(item) for item in items])
@@ -3,12 +3,57 @@ Narrator Agent
 Responsible for generating personalized tour narration/scripts using Gemini.
 """
 
-from services.ai import AIService
+import asyncio
+import re
+from string import Template
+from typing import AsyncIterator, Optional
+from cachetools import LRUCache, TTLCache
+from services.ai import BACKGROUND_GEMINI_SEM, FAILURE_MESSAGE, UNAVAILABLE_MESSAGE
 from models.state import POIStop, UserPreferences, GuidePersonality, TourTheme
 
 from services.knowledge import KnowledgeService
 from agents.base import BaseAgent
 
+__all__ = ["NarratorAgent"]
+
+# Whitespace after sentence-ending punctuation (captured so spacing survives re-joining)
+_SENTENCE_GAP_RE = re.compile(r"((?<=[.!?])\s+)")
+
+# Max POI narrations generated at once when pre-generating a whole route
+NARRATION_BATCH_CONCURRENCY = 8
+
+# Invariant part of the POI narration prompt; only the $-slots change per request
+_POI_PROMPT_BODY = """        The user has arrived at: $poi_name ($address).
+        This stop is part of a $theme themed tour.
+        
+        Facts about this location:
+        $facts
+        
+        REAL WORLD KNOWLEDGE (Use to enhance accuracy):
+        $wiki
+        
+        Your task:
+        Write a short, engaging narration script (3-4 paragraphs max) for this stop.
+        Focus heavily on the '$theme' aspect if possible. THIS MUST BE APPROPRIATE FOR PEOPLE OF ALL AGES.
+        
+        VOICE DELIVERY (ElevenLabs v3 Audio Tags):
+        Use these tags sparingly to add natural expression - don't overuse them:
+        - [sighs], [laughs], [chuckles] - Insert at natural moments
+        - [whispers] - For dramatic or intimate moments
+        - [curious], [thoughtful] - Before pondering questions
+        - [excited] - Only when genuinely warranted, not constantly
+        Example: "[thoughtful] You know, there's something about this place..."
+        
+        TEXT FORMATTING:
+        - Expand abbreviations (write "Saint" not "St.")
+        - Write small numbers as words ("three" not "3")
+        - Use ellipses (...) for natural pauses
+        - Use CAPS sparingly for emphasis on key words
+        
+        If there are specific facts known about this place, weave them in naturally.
+        End with a thought-provoking question or a transition to the next step (which involves walking).
+        """
+
 class NarratorAgent(BaseAgent):
     # Character Personas (injected into prompts based on guide_personality)
     CHARACTER_PERSONAS = {
@@ -18,9 +63,38 @@ class NarratorAgent(BaseAgent):
         'autumn': "You are Autumn, a storyteller. A hint of drama when it fits, but mostly straightforward."
     }
 
+    # Opening lines of every prompt, built once per character so prompts for the
+    # same guide always start with byte-identical text (cache-friendly prefixes)
+    _PROMPT_PREFIXES = {pid: f"\n        {persona}\n" for pid, persona in CHARACTER_PERSONAS.items()}
+
+    # Welcome messages reused across tours, keyed by (personality, theme). Bounded since custom
+    # themes are free-form text; the preloaded standard pairs are hit often enough to stay resident
+    _INTRO_CACHE: LRUCache = LRUCache(maxsize=256)
+
+    # Walking small talk, keyed by (personality, theme, start of context); refreshed hourly
+    _FILLER_CACHE: TTLCache = TTLCache(maxsize=256, ttl=3600)
+
+    # Full POI prompt templates per character, compiled once at import
+    _POI_TEMPLATES = {pid: Template(prefix + _POI_PROMPT_BODY) for pid, prefix in _PROMPT_PREFIXES.items()}
+
+    # Lookup table with pre-lowered keys, plus the generic persona for legacy personality types
+    _PERSONA_MAP = {pid.lower(): persona for pid, persona in CHARACTER_PERSONAS.items()}
+    _FALLBACK_TEMPLATE = "You are a tour guide with a %s personality."
+
     def _get_persona_prompt(self, personality_value: str) -> str:
-        """Get the persona description for a given character ID."""
-        return self.CHARACTER_PERSONAS.get(personality_value.lower(), f"You are a tour guide with a {personality_value} personality.")
+        """Get the persona description for a given character ID (GuidePersonality values are lowercase)."""
+        persona = self._PERSONA_MAP.get(personality_value)
+        if persona is None:
+            persona = self._FALLBACK_TEMPLATE % personality_value
+        return persona
+
+    def _get_prompt_prefix(self, preferences: UserPreferences) -> str:
+        """Get the precomputed persona opener for a prompt, falling back for legacy personalities."""
+        personality_value = preferences.guide_personality.value
+        prefix = self._PROMPT_PREFIXES.get(personality_value)
+        if prefix is None:
+            prefix = f"\n        {self._get_persona_prompt(personality_value)}\n"
+        return prefix
 
     def __init__(self):
         super().__init__(
@@ -28,85 +102,174 @@ class NarratorAgent(BaseAgent):
             system_instruction="You are an expert tour guide narrator."
         )
         self.knowledge_service = KnowledgeService()
+        # Wikipedia lookups (in flight or finished) keyed by POI name
+        self._wiki_tasks: TTLCache = TTLCache(maxsize=64, ttl=3600)
+
+    def _fetch_wiki_facts(self, poi_name: str) -> asyncio.Task:
+        """Start a background Wikipedia lookup for a POI, reusing one already started."""
+        task = self._wiki_tasks.get(poi_name)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None or not task.result())):
+            task = asyncio.create_task(self.knowledge_service.search_wikipedia(poi_name))
+            self._wiki_tasks[poi_name] = task
+            task.add_done_callback(lambda t: self._evict_failed_wiki_task(poi_name, t))
+        return task
+
+    def _evict_failed_wiki_task(self, poi_name: str, task: asyncio.Task) -> None:
+        """Drop a lookup that was cancelled or raised, so the failure isn't reused until the TTL runs out."""
+        if (task.cancelled() or task.exception() is not None) and self._wiki_tasks.get(poi_name) is task:
+            del self._wiki_tasks[poi_name]
+
+    def prefetch_wiki_facts(self, pois: list[POIStop]) -> None:
+        """Warm Wikipedia context for upcoming stops while the user is still at the current one."""
+        for poi in pois:
+            self._fetch_wiki_facts(poi.name)
 
     async def generate_intro(self, preferences: UserPreferences) -> str:
         """Generate a welcome message used at the start of the tour."""
+        key = (preferences.guide_personality.value, preferences.theme)
+        cached = self._INTRO_CACHE.get(key)
+        if cached is not None:
+            return cached
         
-        persona = self._get_persona_prompt(preferences.guide_personality.value)
-        prompt = f"""
-        {persona}
-        The user has chosen a {preferences.theme} themed tour of Providence, RI.
+        prompt = self._get_prompt_prefix(preferences) + f"""        The user has chosen a {preferences.theme} themed tour of Providence, RI.
         
         Generate a brief, engaging welcome message (2-3 sentences max).
         Introduce yourself and getting them excited about the tour.
         Do not say "stop 1" or specific directions yet, just a warm welcome.
         """
         
-        return await self.ai.generate_content(prompt)
+        intro = await self.ai.generate_content(prompt)
+        if intro not in (FAILURE_MESSAGE, UNAVAILABLE_MESSAGE):
+            self._INTRO_CACHE[key] = intro
+        return intro
+
+    async def preload_intros(self) -> None:
+        """Generate the intro for every character/standard theme pair so new tours start instantly."""
+        themes = (TourTheme.HISTORICAL, TourTheme.ART, TourTheme.GHOST)
+        async def _one(preferences: UserPreferences) -> str:
+            async with BACKGROUND_GEMINI_SEM:
+                return await self.generate_intro(preferences)
+
+        await asyncio.gather(*(
+            _one(UserPreferences(theme=theme, guide_personality=GuidePersonality(pid)))
+            for pid in self.CHARACTER_PERSONAS
+            for theme in themes
+        ))
 
-    async def generate_poi_narration(self, poi: POIStop, preferences: UserPreferences, previous_poi: POIStop = None) -> str:
+    async def generate_poi_narration(
+        self,
+        poi: POIStop,
+        preferences: UserPreferences,
+        previous_poi: POIStop = None,
+        upcoming: Optional[list[POIStop]] = None
+    ) -> str:
         """Generate the main narration script for a POI stop."""
-        
-        # 1. Fetch RAG Facts
+        prompt = await self._build_poi_prompt(poi, preferences, upcoming)
+        return await self.ai.generate_content(prompt)
+
+    def start_poi_narrations(
+        self,
+        pois: list[POIStop],
+        preferences: UserPreferences,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> list[asyncio.Task]:
+        """
+        Start generating every stop's narration in the background, one task per stop (in order),
+        so a caller can wait on just the stop it needs.
+        Concurrency is bounded by semaphore (e.g. the tour's), else NARRATION_BATCH_CONCURRENCY, and across
+        all tours by BACKGROUND_GEMINI_SEM.
+        """
+        # Start every Wikipedia lookup now, so stops queued behind the semaphore find their facts ready
+        self.prefetch_wiki_facts(pois)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(NARRATION_BATCH_CONCURRENCY)
+
+        async def _one(i: int, poi: POIStop) -> str:
+            async with semaphore, BACKGROUND_GEMINI_SEM:
+                return await self.generate_poi_narration(poi, preferences, upcoming=pois[i + 1:i + 3])
+
+        return [asyncio.create_task(_one(i, poi)) for i, poi in enumerate(pois)]
+
+    async def generate_all_poi_narrations(
+        self,
+        pois: list[POIStop],
+        preferences: UserPreferences,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> list:
+        """
+        Generate narrations for every stop concurrently (see start_poi_narrations).
+        Returns one result per stop, in order; failed stops hold their exception instead.
+        """
+        return await asyncio.gather(*self.start_poi_narrations(pois, preferences, semaphore), return_exceptions=True)
+
+    async def generate_poi_narration_stream(
+        self,
+        poi: POIStop,
+        preferences: UserPreferences,
+        previous_poi: POIStop = None,
+        upcoming: Optional[list[POIStop]] = None
+    ) -> AsyncIterator[str]:
+        """Stream the narration script for a POI stop one sentence at a time, so TTS can start early."""
+        prompt = await self._build_poi_prompt(poi, preferences, upcoming)
+
+        buffer = ""
+        async for chunk in self.ai.generate_content_stream(prompt):
+            buffer += chunk
+            # Split yields [sentence, gap, sentence, gap, ..., unfinished tail]
+            *complete, buffer = _SENTENCE_GAP_RE.split(buffer)
+            for sentence, gap in zip(complete[::2], complete[1::2]):
+                yield sentence + gap
+
+        if buffer:
+            yield buffer
+
+    async def _build_poi_prompt(
+        self,
+        poi: POIStop,
+        preferences: UserPreferences,
+        upcoming: Optional[list[POIStop]] = None
+    ) -> str:
+        """Assemble the narration prompt for a POI stop, including RAG context."""
+        # 1. Fetch RAG Facts (in the background, alongside prefetches for the next stops)
         print(f"📖 Fetching RAG facts for: {poi.name}...")
-        wiki_facts = self.knowledge_service.search_wikipedia(poi.name)
+        wiki_task = self._fetch_wiki_facts(poi.name)
+        if upcoming:
+            self.prefetch_wiki_facts(upcoming)
+        
+        # Shielded: the lookup is shared by every tour at this POI, so one caller being
+        # cancelled (tour deleted, client gone) mustn't cancel it for the rest
+        wiki_facts = await asyncio.shield(wiki_task)
         if wiki_facts:
             print("✅ Found Wikipedia context")
         
-        persona = self._get_persona_prompt(preferences.guide_personality.value)
-        prompt = f"""
-        {persona}
-        The user has arrived at: {poi.name} ({poi.address}).
-        This stop is part of a {preferences.theme} themed tour.
-        
-        Facts about this location:
-        {chr(10).join(f"- {t}" for t in poi.themes)}
-        
-        REAL WORLD KNOWLEDGE (Use to enhance accuracy):
-        {wiki_facts}
-        
-        Your task:
-        Write a short, engaging narration script (3-4 paragraphs max) for this stop.
-        Focus heavily on the '{preferences.theme}' aspect if possible. THIS MUST BE APPROPRIATE FOR PEOPLE OF ALL AGES.
-        
-        VOICE DELIVERY (ElevenLabs v3 Audio Tags):
-        Use these tags sparingly to add natural expression - don't overuse them:
-        - [sighs], [laughs], [chuckles] - Insert at natural moments
-        - [whispers] - For dramatic or intimate moments
-        - [curious], [thoughtful] - Before pondering questions
-        - [excited] - Only when genuinely warranted, not constantly
-        Example: "[thoughtful] You know, there's something about this place..."
-        
-        TEXT FORMATTING:
-        - Expand abbreviations (write "Saint" not "St.")
-        - Write small numbers as words ("three" not "3")
-        - Use ellipses (...) for natural pauses
-        - Use CAPS sparingly for emphasis on key words
-        
-        If there are specific facts known about this place, weave them in naturally.
-        End with a thought-provoking question or a transition to the next step (which involves walking).
-        """
-        
-        return await self.ai.generate_content(prompt)
+        template = self._POI_TEMPLATES.get(preferences.guide_personality.value)
+        if template is None:
+            # Legacy personality: generic persona prefix plus the shared body
+            template = Template(self._get_prompt_prefix(preferences) + _POI_PROMPT_BODY)
+        return template.substitute(
+            poi_name=poi.name, address=poi.address, theme=preferences.theme, facts=poi.themes_bullets, wiki=wiki_facts
+        )
 
     async def generate_filler(self, context: str, preferences: UserPreferences) -> str:
         """Generate filler text/small talk while walking."""
-        persona = self._get_persona_prompt(preferences.guide_personality.value)
-        prompt = f"""
-        {persona}
-        The user is walking between stops.
+        key = (preferences.guide_personality.value, preferences.theme, context[:64])
+        cached = self._FILLER_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        prompt = self._get_prompt_prefix(preferences) + f"""        The user is walking between stops.
         Context: {context}
         
         Say something brief (1 sentence) to keep the energy up or share a quick tidbit.
         """
-        return await self.ai.generate_content(prompt)
+        filler = await self.ai.generate_content(prompt)
+        if filler not in (FAILURE_MESSAGE, UNAVAILABLE_MESSAGE):
+            self._FILLER_CACHE[key] = filler
+        return filler
 
     async def generate_outro(self, preferences: UserPreferences) -> str:
         """Generate a farewell message when the tour is complete."""
-        persona = self._get_persona_prompt(preferences.guide_personality.value)
-        prompt = f"""
-        {persona}
-        The user has completed their {preferences.theme} tour of Providence.
+        prompt = self._get_prompt_prefix(preferences) + f"""        The user has completed their {preferences.theme} tour of Providence.
         
         Generate a warm, memorable farewell message (2-3 sentences).
         - Thank them for exploring with you.
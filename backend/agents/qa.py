@@ -3,9 +3,28 @@ Q&A Agent
 Responsible for answering user questions about the tour and current POI.
 """
 
+import asyncio
+import orjson
 from models.state import POIStop, UserPreferences
 from services.knowledge import KnowledgeService
-from agents.base import BaseAgent
+from agents.base import BaseAgent, extract_json
+from agents.director import _fast_intent
+
+# Conversation turns included in Q&A prompts
+QA_HISTORY_WINDOW = 6
+
+# Gemini JSON mode: classify the message and (for chat) answer it in one call
+HANDLE_MESSAGE_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": ["CHAT", "REPLAN"]},
+            "answer": {"type": "string"}
+        },
+        "required": ["intent"]
+    }
+}
 
 class QAAgent(BaseAgent):
     def __init__(self):
@@ -24,7 +43,7 @@ class QAAgent(BaseAgent):
         
         Return ONLY the category name (REPLAN or CHAT).
         """
-        response = await self.ai.generate_content(prompt)
+        response = await self.generate_cached(prompt)
         return response.strip().upper()
 
     async def answer_question(
@@ -37,10 +56,10 @@ class QAAgent(BaseAgent):
         """Generate an answer using RAG knowledge. Returns (answer, context)."""
         
         # 1. Fetch External Knowledge (Wikipedia + Maps)
-        wiki_info = self.knowledge_service.search_wikipedia(current_stop.name if current_stop else question)
+        wiki_info = await self.knowledge_service.search_wikipedia(current_stop.name if current_stop else question)
         
         # Format conversation history
-        recent_history = history[-6:] if history else []
+        recent_history = history[-QA_HISTORY_WINDOW:] if history else []
         history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent_history])
         
         poi_context_label = f"At: {current_stop.name}" if current_stop else "Walking"
@@ -61,5 +80,68 @@ class QAAgent(BaseAgent):
         Don't be overly enthusiastic or performative. Just be helpful.
         """
         
-        answer = await self.ai.generate_content(prompt)
+        answer = await self.generate_cached(prompt)
         return answer, wiki_info
+
+    async def handle_message(
+        self,
+        message: str,
+        current_stop: POIStop,
+        preferences: UserPreferences,
+        history: list[dict]
+    ) -> tuple[str, str, str]:
+        """
+        Classify a message and answer it in a single Gemini call.
+        Returns (intent, answer, context); answer is empty for REPLAN.
+        """
+        # Obvious commands ("skip this one", "find coffee") are replans: no facts or LLM call needed
+        if _fast_intent(message) is not None:
+            return "REPLAN", "", ""
+
+        # Wikipedia is fetched while the history is formatted
+        wiki_task = asyncio.create_task(
+            self.knowledge_service.search_wikipedia(current_stop.name if current_stop else message)
+        )
+
+        recent_history = history[-QA_HISTORY_WINDOW:] if history else []
+        history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent_history])
+        poi_context_label = f"At: {current_stop.name}" if current_stop else "Walking"
+
+        wiki_info = await wiki_task
+
+        prompt = f"""
+        You are a tour guide with a {preferences.guide_personality.value} personality.
+        User is at {poi_context_label}.
+        
+        REAL WORLD KNOWLEDGE:
+        {wiki_info}
+        
+        Chat History:
+        {history_text}
+        
+        User: "{message}"
+        
+        First classify the message:
+        - "REPLAN": User wants to visit a specific place, find food/coffee, change topic, or skip the current stop.
+        - "CHAT": User is asking a question, making a comment, or chatting.
+        
+        If CHAT, answer naturally and concisely (1-3 sentences). Be genuine - if you don't know something, say so.
+        Don't be overly enthusiastic or performative. Just be helpful.
+        If REPLAN, leave the answer empty.
+        
+        Return JSON: {{"intent": "CHAT" or "REPLAN", "answer": "..."}}
+        """
+
+        # Cached like the other Q&A calls: a repeated question at the same stop and point in the
+        # conversation (e.g. a retried request) reuses the answer
+        response = await self.generate_cached(prompt, generation_config=HANDLE_MESSAGE_CONFIG)
+        try:
+            parsed = extract_json(response)
+        except orjson.JSONDecodeError:
+            # Not JSON (e.g. service unavailable): treat the text as a chat reply
+            return "CHAT", response, wiki_info
+
+        intent = str(parsed.get("intent", "CHAT")).strip().upper()
+        if "REPLAN" in intent:
+            return "REPLAN", "", wiki_info
+        return "CHAT", parsed.get("answer") or "", wiki_info
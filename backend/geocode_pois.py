@@ -4,12 +4,20 @@ Geocode POI addresses using Google Maps Geocoding API
 to fix incorrect coordinates.
 """
 
+import asyncio
 import json
 import os
 import time
-import requests
+import httpx
 from pathlib import Path
 
+# Google Geocoding allows 50 QPS; stay a little under it
+MAX_CONCURRENT_REQUESTS = 25
+MAX_REQUESTS_PER_SECOND = 45
+
+# Address -> coordinates from previous runs, so only new/changed addresses hit the API
+CACHE_FILE = Path(__file__).parent / "data" / "geocode_cache.json"
+
 # Load API key from environment or .env file
 def get_api_key():
     # Try environment first
@@ -34,7 +42,30 @@ def get_api_key():
     return None
 
 
-def geocode_address(address: str, api_key: str) -> tuple[float, float] | None:
+class RateLimiter:
+    """Spaces request start times evenly so bursts stay under the QPS quota."""
+
+    def __init__(self, per_second: int):
+        self.interval = 1.0 / per_second
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def geocode_address(
+    client: httpx.AsyncClient,
+    address: str,
+    api_key: str,
+    sem: asyncio.Semaphore,
+    limiter: RateLimiter
+) -> tuple[float, float] | None:
     """
     Use Google Maps Geocoding API to get lat/lng from an address.
     Returns (lat, lng) tuple or None if failed.
@@ -46,7 +77,9 @@ def geocode_address(address: str, api_key: str) -> tuple[float, float] | None:
     }
     
     try:
-        response = requests.get(url, params=params)
+        async with sem:
+            await limiter.wait()
+            response = await client.get(url, params=params)
         data = response.json()
         
         if data["status"] == "OK" and data["results"]:
@@ -61,7 +94,7 @@ def geocode_address(address: str, api_key: str) -> tuple[float, float] | None:
         return None
 
 
-def main():
+async def main():
     # Get API key
     api_key = get_api_key()
     if not api_key:
@@ -76,8 +109,28 @@ def main():
     
     print(f"🌍 Geocoding {len(pois)} POI addresses...")
     print(f"   Using API key: {api_key[:10]}...")
+    
+    # Addresses geocoded on earlier runs (address -> [lat, lng])
+    cache = {}
+    if CACHE_FILE.exists():
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    
+    # Geocode only new/changed addresses, concurrently (bounded + rate limited)
+    to_geocode = sorted({poi.get("address", "") for poi in pois} - cache.keys())
+    print(f"   {len(to_geocode)} addresses to geocode, {len(cache)} already cached")
     print()
     
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS)
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        results = await asyncio.gather(*[
+            geocode_address(client, address, api_key, sem, limiter)
+            for address in to_geocode
+        ])
+    fresh = {address: coords for address, coords in zip(to_geocode, results) if coords}
+    
     updated = 0
     for i, poi in enumerate(pois):
         address = poi.get("address", "")
@@ -87,28 +140,31 @@ def main():
         print(f"   Address: {address}")
         print(f"   Old coords: {old_coords}")
         
-        # Geocode the address
-        new_coords = geocode_address(address, api_key)
-        
-        if new_coords:
+        new_coords = fresh.get(address)
+        if address in cache:
+            poi["coordinates"] = list(cache[address])
+            print(f"   💾 Cached coords: {tuple(cache[address])}")
+        elif new_coords:
             poi["coordinates"] = list(new_coords)
             print(f"   ✅ New coords: {new_coords}")
             updated += 1
         else:
-            print(f"   ⚠️  Keeping old coordinates")
+            print("   ⚠️  Keeping old coordinates")
         
         print()
-        
-        # Rate limiting: 50 requests per second max, be conservative
-        time.sleep(0.2)
     
     # Save updated POIs
     with open(pois_file, 'w') as f:
         json.dump(pois, f, indent=4)
     
+    # Save the cache in one write
+    cache.update({address: list(coords) for address, coords in fresh.items()})
+    with open(CACHE_FILE, 'w') as f:
+        json.dump(cache, f, indent=4)
+    
     print(f"✅ Done! Updated {updated}/{len(pois)} POI coordinates")
     print(f"   Saved to: {pois_file}")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -3,29 +3,69 @@
 FastAPI application with WebSocket support for real-time tour updates.
 """
 
+import asyncio
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import uvicorn
 import os
+from typing import Optional
 
 # Load environment variables
 load_dotenv()
 
-from routes.tour import router as tour_router
+from routes.tour import router as tour_router, narrator_agent, voice_service, tour_manager, stream_stop_narration, AUDIO_CACHE
 from routes.admin import router as admin_router
-from models.state import TourManager
+from services.poi_store import load_poi_store
+from services.voice import VoiceService, start_log_listener, stop_log_listener
+from middleware.profiling import add_profiling_middleware
+from models.state import ARRIVAL_RADIUS_M
 
-# Global tour manager instance
-tour_manager = TourManager()
+# Threads behind asyncio.to_thread (route generation, POI loads, voice cache file I/O); the
+# stdlib default of CPU count + 4 queues bursts on small hosts
+THREAD_POOL_WORKERS = int(os.getenv("THREAD_POOL_WORKERS", "32"))
+
+
+async def prewarm_caches():
+    """Fill the intro and Wikipedia caches before the first tour needs them."""
+    pois = (await asyncio.to_thread(load_poi_store))["all"]
+
+    # One failed lookup shouldn't abort the rest of the warm-up
+    results = await asyncio.gather(
+        narrator_agent.preload_intros(),
+        *(narrator_agent.knowledge_service.search_wikipedia(poi["name"]) for poi in pois),
+        return_exceptions=True,
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    for error in failures:
+        print(f"⚠️ Cache warm-up step failed: {error}")
+    print(f"🔥 Caches warmed: intros + Wikipedia for {len(pois)} POIs ({len(failures)} failed)")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     print("🚀 Tour Guide Backend starting...")
+    start_log_listener()
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS))
+    # Opt-in (PREWARM=1): warming spends LLM and Wikipedia quota on every boot, so dev reloads skip it.
+    # Runs in the background so startup isn't blocked.
+    prewarm = None
+    if os.getenv("PREWARM", "0") == "1":
+        prewarm = asyncio.create_task(prewarm_caches())
+    # Separate opt-in: every uncached preview is a paid ElevenLabs synthesis
+    prewarm_previews = None
+    if os.getenv("PREWARM_VOICE_PREVIEWS", "0") == "1":
+        prewarm_previews = asyncio.create_task(voice_service.prewarm_previews())
     yield
+    for task in (prewarm, prewarm_previews):
+        if task:
+            task.cancel()
+    await VoiceService.aclose()
+    stop_log_listener()
     print("👋 Tour Guide Backend shutting down...")
 
 
@@ -45,6 +85,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# pyinstrument call trees via ?profile=1 (only when PROFILING=1)
+add_profiling_middleware(app)
+
 # Include routers
 app.include_router(tour_router, prefix="/api")
 app.include_router(admin_router, prefix="/api")
@@ -56,6 +99,16 @@ async def health_check():
     return {"status": "healthy", "service": "tour-guide-backend"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Cache sizes for monitoring memory use."""
+    return {
+        "active_tours": len(tour_manager.tours),
+        "audio_cache_bytes": AUDIO_CACHE.currsize,
+        "audio_cache_entries": len(AUDIO_CACHE)
+    }
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API info."""
@@ -70,27 +123,83 @@ async def root():
 class ConnectionManager:
     def __init__(self):
         self.active_connections: dict[str, WebSocket] = {}
+        # Last tour state sent on each connection, so later updates only carry what changed
+        self.last_state: dict[str, dict] = {}
+        # Connections whose client applies tour_state_patch messages (opted in with ?patches=1)
+        self.patch_clients: set[str] = set()
 
-    async def connect(self, tour_id: str, websocket: WebSocket):
+    async def connect(self, tour_id: str, websocket: WebSocket, patches: bool = False):
         await websocket.accept()
         self.active_connections[tour_id] = websocket
+        self.last_state.pop(tour_id, None)
+        if patches:
+            self.patch_clients.add(tour_id)
+        else:
+            self.patch_clients.discard(tour_id)
 
     def disconnect(self, tour_id: str):
         if tour_id in self.active_connections:
             del self.active_connections[tour_id]
+        self.last_state.pop(tour_id, None)
+        self.patch_clients.discard(tour_id)
+
+    async def send_tour_state(self, tour_id: str, state: dict):
+        """
+        Send the tour state when it changes: in full, or (for clients that opted in to patches)
+        in full once and then only the top-level fields that changed.
+        """
+        if tour_id not in self.active_connections:
+            return
+        last = self.last_state.get(tour_id)
+        if last is None:
+            message = {"type": "tour_state", "state": state}
+        else:
+            changes = {key: value for key, value in state.items() if last.get(key) != value}
+            if not changes:
+                return
+            if tour_id in self.patch_clients:
+                message = {"type": "tour_state_patch", "changes": changes}
+            else:
+                message = {"type": "tour_state", "state": state}
+        self.last_state[tour_id] = state
+        await self.send_state_update(tour_id, message)
 
     async def send_state_update(self, tour_id: str, data: dict):
-        if tour_id in self.active_connections:
-            await self.active_connections[tour_id].send_json(data)
+        websocket = self.active_connections.get(tour_id)
+        if websocket:
+            # orjson encodes faster than send_json's stdlib json; still a text frame for clients
+            await websocket.send_text(orjson.dumps(data).decode())
 
 
 ws_manager = ConnectionManager()
 
 
+async def stream_arrival_narration(tour_id: str, tour):
+    """On arrival at the current stop, stream its narration to the client as it is generated."""
+    stop = tour.route.current_stop
+    if not stop or tour.narration_progress.current_stop_id == stop.id:
+        return
+    arrived_idx, _ = tour.route.nearest_within(*tour.current_location, radius_m=ARRIVAL_RADIUS_M)
+    if arrived_idx != tour.route.current_stop_index:
+        return
+
+    # Sentence-sized chunks, so the client can request audio (and hit the audio cache) per sentence
+    async for piece in stream_stop_narration(tour, stop):
+        await ws_manager.send_state_update(tour_id, {"type": "narration_chunk", "poi_id": stop.id, "text": piece})
+    await ws_manager.send_state_update(tour_id, {"type": "narration_complete", "poi_id": stop.id})
+
+
 @app.websocket("/ws/tour/{tour_id}")
-async def websocket_endpoint(websocket: WebSocket, tour_id: str):
-    """WebSocket endpoint for real-time tour updates."""
-    await ws_manager.connect(tour_id, websocket)
+async def websocket_endpoint(websocket: WebSocket, tour_id: str, patches: bool = False, narration: bool = False):
+    """
+    WebSocket endpoint for real-time tour updates.
+    Newer message types are opt-in, so existing clients keep getting what they understand:
+    ?patches=1 sends tour_state_patch diffs instead of full tour_state messages, and
+    ?narration=1 streams arrival narration as narration_chunk / narration_complete messages.
+    """
+    await ws_manager.connect(tour_id, websocket, patches=patches)
+    # Arrival narration streams in the background so location updates keep being handled meanwhile
+    narration_task: Optional[asyncio.Task] = None
     try:
         while True:
             data = await websocket.receive_json()
@@ -101,8 +210,21 @@ async def websocket_endpoint(websocket: WebSocket, tour_id: str):
                     "type": "state_update",
                     "message": "Location received"
                 })
+                try:
+                    lat, lng = float(data["lat"]), float(data["lng"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                tour = tour_manager.update_location(tour_id, lat, lng)
+                if tour:
+                    # Usually only current_location changed, so patch clients get a small message
+                    await ws_manager.send_tour_state(tour_id, tour.to_dict())
+                    if narration and (narration_task is None or narration_task.done()):
+                        narration_task = asyncio.create_task(stream_arrival_narration(tour_id, tour))
     except WebSocketDisconnect:
         ws_manager.disconnect(tour_id)
+    finally:
+        if narration_task is not None:
+            narration_task.cancel()
 
 
 if __name__ == "__main__":
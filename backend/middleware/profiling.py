@@ -0,0 +1,40 @@
+"""
+Request Profiling
+Optional pyinstrument middleware: with PROFILING=1, any request with ?profile=1
+returns an HTML call tree of that request instead of its normal response.
+"""
+
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+
+PROFILING_ENABLED = os.getenv("PROFILING", "0") == "1"
+
+
+def add_profiling_middleware(app: FastAPI) -> None:
+    """Register the profiler on app when PROFILING=1 (no-op otherwise, and in production)."""
+    if not PROFILING_ENABLED:
+        return
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        print("⚠️ Warning: PROFILING=1 but pyinstrument is not installed. Profiling disabled.")
+        return
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if not request.query_params.get("profile"):
+            return await call_next(request)
+
+        # async_mode="enabled" attributes time spent awaiting (Gemini, ElevenLabs) to the awaiting handler
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        response = await call_next(request)
+        # Drain the body so streaming endpoints are profiled end to end
+        async for _ in response.body_iterator:
+            pass
+        profiler.stop()
+        return HTMLResponse(profiler.output_html())
+
+    print("🔬 Profiling enabled: add ?profile=1 to any request")
@@ -3,14 +3,36 @@ Tour State Management
 Defines the core state structure for tours and the TourManager for session handling.
 """
 
+import asyncio
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 from datetime import datetime
+import math
+import time
 import uuid
+from cachetools import TLRUCache
 
 
 
+# Memory bounds: live tours, and how long an untouched tour is kept
+MAX_TOURS = 10_000
+TOUR_IDLE_TTL_SECONDS = 3600
+
+# Chat/narration turns kept per tour; older turns drop off the front
+CONVERSATION_HISTORY_MAX = 40
+
+# Gemini calls one tour may have in flight for background work (e.g. narration pre-generation)
+TOUR_MAX_CONCURRENT_LLM_CALLS = 3
+
+# Mean Earth radius, for the arrival check (same value as services.routing)
+EARTH_RADIUS_M = 6371000
+
+# Distance at which the user counts as standing at a stop
+ARRIVAL_RADIUS_M = 50
+
+
 class TourTheme:
     HISTORICAL = "historical"
     ART = "art"
@@ -57,6 +79,24 @@ class POIStop:
     poi_type: str
     estimated_time: int = 8  # minutes at this stop
     themes: list[str] = field(default_factory=list)
+    # Themes as a "- theme" bullet list for prompts, built once at load
+    themes_bullets: str = field(default="", init=False, repr=False, compare=False)
+    # (min_lat, max_lat, min_lng, max_lng) enclosing the ARRIVAL_RADIUS_M circle, for a trig-free "not here yet" check
+    bbox: tuple[float, float, float, float] = field(default=(0.0, 0.0, 0.0, 0.0), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.themes_bullets = "\n".join(f"- {t}" for t in self.themes)
+        lat, lng = self.coordinates
+        angle = ARRIVAL_RADIUS_M / EARTH_RADIUS_M
+        dlat = math.degrees(angle)
+        # Widest longitude span of the circle on a sphere (asin(sin d / cos lat) >= d / cos lat)
+        dlng = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+        self.bbox = (lat - dlat, lat + dlat, lng - dlng, lng + dlng)
+
+    def in_bbox(self, lat: float, lng: float) -> bool:
+        """True if (lat, lng) falls inside the stop's arrival bounding box."""
+        min_lat, max_lat, min_lng, max_lng = self.bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
 
 
 @dataclass
@@ -66,6 +106,38 @@ class Route:
     current_stop_index: int = 0
     destination_coords: Optional[tuple[float, float]] = None
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "stops":
+            # Reassigning stops rebuilds the flat radian arrays (stop_lats_rad / stop_lons_rad)
+            self.stop_lats_rad = [math.radians(s.coordinates[0]) for s in value]
+            self.stop_lons_rad = [math.radians(s.coordinates[1]) for s in value]
+            self._stops_payload = None
+
+    def add_stop(self, idx: int, stop: POIStop):
+        """Insert a stop at idx, keeping the coordinate arrays in sync."""
+        self.stops.insert(idx, stop)
+        self.stop_lats_rad.insert(idx, math.radians(stop.coordinates[0]))
+        self.stop_lons_rad.insert(idx, math.radians(stop.coordinates[1]))
+        self._stops_payload = None
+
+    def stops_payload(self) -> list[dict]:
+        """Serialized stops for to_dict, rebuilt only when the stop list changes."""
+        if self._stops_payload is None:
+            self._stops_payload = [
+                {
+                    "id": stop.id,
+                    "name": stop.name,
+                    "coordinates": stop.coordinates,
+                    "address": stop.address,
+                    "poi_type": stop.poi_type,
+                    "estimated_time": stop.estimated_time,
+                    "themes": stop.themes
+                }
+                for stop in self.stops
+            ]
+        return self._stops_payload
+
     @property
     def current_stop(self) -> Optional[POIStop]:
         if 0 <= self.current_stop_index < len(self.stops):
@@ -79,6 +151,43 @@ class Route:
             return self.stops[next_idx]
         return None
 
+    def nearest_stop(self, lat: float, lng: float) -> Optional[int]:
+        """Index of the stop closest to (lat, lng), or None for an empty route."""
+        if not self.stops:
+            return None
+        # Equirectangular distance is plenty to rank stops within a walking tour
+        lat_rad = math.radians(lat)
+        lon_rad = math.radians(lng)
+        cos_lat = math.cos(lat_rad)
+        lats = self.stop_lats_rad
+        lons = self.stop_lons_rad
+        return min(
+            range(len(lats)),
+            key=lambda i: (lats[i] - lat_rad) ** 2 + ((lons[i] - lon_rad) * cos_lat) ** 2
+        )
+
+    def nearest_within(self, lat: float, lng: float, radius_m: float) -> tuple[Optional[int], Optional[float]]:
+        """
+        Nearest stop to (lat, lng) if it lies within radius_m.
+        Returns (stop index, distance in meters), or (None, None) when no stop is that close.
+        """
+        idx = self.nearest_stop(lat, lng)
+        if idx is None:
+            return None, None
+
+        # Cheap reject: latitude difference alone already exceeds the radius
+        lat_rad = math.radians(lat)
+        max_angle = radius_m / EARTH_RADIUS_M
+        stop_lat = self.stop_lats_rad[idx]
+        if abs(stop_lat - lat_rad) > max_angle:
+            return None, None
+
+        # Exact haversine for the single candidate
+        a = (math.sin((stop_lat - lat_rad) / 2) ** 2
+             + math.cos(lat_rad) * math.cos(stop_lat) * math.sin((self.stop_lons_rad[idx] - math.radians(lng)) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+        return (idx, distance) if distance <= radius_m else (None, None)
+
     def advance(self) -> bool:
         """Move to next stop. Returns False if tour is complete."""
         if self.current_stop_index < len(self.stops) - 1:
@@ -101,6 +210,7 @@ class TourState:
     """Complete tour state."""
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = field(default_factory=datetime.now)
+    created_at_mono: float = field(default_factory=time.monotonic)  # For elapsed-time math
     
     # User preferences
     preferences: UserPreferences = field(default_factory=UserPreferences)
@@ -111,9 +221,12 @@ class TourState:
     # Current state
     status: TourStatus = TourStatus.INITIAL
     current_location: Optional[tuple[float, float]] = None
+    nearest_stop_index: Optional[int] = None  # Refreshed on every location update
+    voice_id: Optional[str] = None  # ElevenLabs voice, chosen once at creation
     
-    # Conversation context
-    conversation_history: list[dict] = field(default_factory=list)
+    # Conversation context (bounded), plus how many turns there have been in total
+    conversation_history: deque = field(default_factory=lambda: deque(maxlen=CONVERSATION_HISTORY_MAX))
+    history_total: int = 0
     
     # Narration tracking
     narration_progress: NarrationProgress = field(default_factory=NarrationProgress)
@@ -121,8 +234,13 @@ class TourState:
     # POI knowledge cache
     poi_knowledge_cache: dict = field(default_factory=dict)
     
-    # Audio cache to save credits (text_hash -> bytes)
-    audio_cache: dict[str, bytes] = field(default_factory=dict)
+    # Narrations generated ahead of arrival (stop_id -> script)
+    poi_narrations: dict[str, str] = field(default_factory=dict)
+
+    # Limits this tour's background LLM work so one user can't starve the shared Gemini quota
+    llm_semaphore: asyncio.Semaphore = field(
+        default_factory=lambda: asyncio.Semaphore(TOUR_MAX_CONCURRENT_LLM_CALLS), repr=False, compare=False
+    )
 
     def to_dict(self) -> dict:
         """Serialize state to dictionary."""
@@ -137,25 +255,24 @@ class TourState:
                 "interactive": self.preferences.interactive
             },
             "route": {
-                "stops": [
-                    {
-                        "id": stop.id,
-                        "name": stop.name,
-                        "coordinates": stop.coordinates,
-                        "address": stop.address,
-                        "poi_type": stop.poi_type,
-                        "estimated_time": stop.estimated_time,
-                        "themes": stop.themes
-                    }
-                    for stop in self.route.stops
-                ],
+                "stops": self.route.stops_payload(),
                 "current_stop_index": self.route.current_stop_index
             },
             "status": self.status.value,
             "current_location": self.current_location,
+            "nearest_stop_index": self.nearest_stop_index,
             "current_stop": self.route.current_stop.name if self.route.current_stop else None
         }
 
+    def add_message(self, role: str, content: str) -> None:
+        """Record a conversation turn."""
+        self.conversation_history.append({"role": role, "content": content})
+        self.history_total += 1
+
+    def recent_history(self, n: int) -> list[dict]:
+        """The last n conversation turns, oldest first."""
+        return list(self.conversation_history)[-n:]
+
     def transition_to(self, new_status: TourStatus) -> None:
         """Transition to a new tour status."""
         valid_transitions = {
@@ -175,7 +292,13 @@ class TourManager:
     """Manages active tour sessions."""
     
     def __init__(self):
-        self.tours: dict[str, TourState] = {}
+        # Tours expire after TOUR_IDLE_TTL_SECONDS without being looked up. Every access runs on the
+        # event loop with no await in between, so lookups and mutations need no lock
+        self.tours: TLRUCache = TLRUCache(
+            maxsize=MAX_TOURS,
+            ttu=lambda _tour_id, _tour, now: now + TOUR_IDLE_TTL_SECONDS,
+            timer=time.monotonic
+        )
 
     def create_tour(self, preferences: dict) -> TourState:
         """Create a new tour with given preferences."""
@@ -193,13 +316,18 @@ class TourManager:
 
     def get_tour(self, tour_id: str) -> Optional[TourState]:
         """Retrieve a tour by ID."""
-        return self.tours.get(tour_id)
+        tour = self.tours.get(tour_id)
+        if tour is not None:
+            # Re-insert to push back the idle expiry
+            self.tours[tour_id] = tour
+        return tour
 
     def update_location(self, tour_id: str, lat: float, lng: float) -> Optional[TourState]:
         """Update tour location and check for POI proximity."""
         tour = self.get_tour(tour_id)
         if tour:
             tour.current_location = (lat, lng)
+            tour.nearest_stop_index = tour.route.nearest_stop(lat, lng)
         return tour
 
     def delete_tour(self, tour_id: str) -> bool:
@@ -3,58 +3,74 @@ Tour API Routes
 Endpoints for tour creation, management, and state updates.
 """
 
-from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel
-from typing import Optional
-import json
-from pathlib import Path
-
-from models.state import TourManager, TourStatus
-from services.routing import generate_route, get_walking_directions, check_poi_proximity
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, NamedTuple, Optional
+from functools import lru_cache
+from cachetools import LRUCache
+import asyncio
+import bisect
+import math
+import orjson
+
+from models.state import ARRIVAL_RADIUS_M, TourManager, TourState, TourStatus
+from services.poi_store import load_poi_store_async
+from services.routing import generate_route, get_walking_directions_async, check_poi_proximity, haversine_distance
 from config import get_config
 
-router = APIRouter(tags=["tour"])
+# orjson-backed JSON for every endpoint that returns plain data
+router = APIRouter(tags=["tour"], default_response_class=ORJSONResponse)
 
 from agents.narrator import NarratorAgent
-from agents.qa import QAAgent
+from agents.qa import QAAgent, QA_HISTORY_WINDOW
 from agents.director import TourDirectorAgent
-from services.voice import VoiceService
+from services.voice import STREAM_MODEL_ID, VoiceService
+from services.ai import FAILURE_MESSAGE, UNAVAILABLE_MESSAGE
 import re
 
 # ...
 
+# Explicit Character -> Voice ID mapping (bypasses fuzzy logic)
+CHARACTER_VOICE_MAP = {
+    'henry': 'TxGEqnHWrfWFTfGW9XjX',    # Josh (Friendly Local)
+    'quentin': 'onwK4e9ZLuTAKqWW03F9',  # Daniel (Professor)
+    'drew': 'iP95p4xoKVk53GoZ742B',      # Chris (Explorer)
+    'autumn': 'pFZP5JQG7iQjIQuC4Bku',    # Lily (Storyteller)
+}
+
+# Fallback keywords for non-character tours: theme words and personality words are
+# matched separately, and the earliest rule in VOICE_RULES wins when several hit
+_THEME_VOICE_RE = re.compile(r"ghost|history|art")
+_PERSONALITY_VOICE_RE = re.compile(r"creepy|serious|fun")
+VOICE_RULES = {
+    'ghost': (0, ('female', 'ghost')),      # Autumn Veil for spooky/reflective
+    'creepy': (0, ('female', 'ghost')),
+    'history': (1, ('male', 'history')),    # Quentin (narrator) or Jane (audiobook)
+    'serious': (1, ('male', 'history')),
+    'art': (2, ('female', 'art')),          # Autumn Veil
+    'fun': (3, ('male', 'fun')),            # Drew!
+}
+DEFAULT_VOICE_BUCKET = ('male', 'friendly')  # Henry
+
+
+@lru_cache(maxsize=64)
 def get_voice_for_tour(theme: str, personality: str) -> str:
-    """Deterministically select a voice based on tour parameters."""
+    """Deterministically select a voice based on tour parameters (memoized; both inputs are low-cardinality)."""
     personality = personality.lower()
 
-    # Explicit Character -> Voice ID mapping (bypasses fuzzy logic)
-    CHARACTER_VOICE_MAP = {
-        'henry': 'TxGEqnHWrfWFTfGW9XjX',    # Josh (Friendly Local)
-        'quentin': 'onwK4e9ZLuTAKqWW03F9',  # Daniel (Professor)
-        'drew': 'iP95p4xoKVk53GoZ742B',      # Chris (Explorer)
-        'autumn': 'pFZP5JQG7iQjIQuC4Bku',    # Lily (Storyteller)
-    }
-
-    if personality in CHARACTER_VOICE_MAP:
+    voice_id = CHARACTER_VOICE_MAP.get(personality)
+    if voice_id is not None:
         print(f"🎤 Using character voice for '{personality}'")
-        return CHARACTER_VOICE_MAP[personality]
+        return voice_id
 
-    # Fallback to theme/personality-based fuzzy logic
-    theme = theme.lower()
-    
-    # Logic table
-    if 'ghost' in theme or 'creepy' in personality:
-        return voice_service.select_voice_id('female', 'ghost') # Autumn Veil for spooky/reflective
-    if 'history' in theme or 'serious' in personality:
-         # Use Quentin (narrator) or Jane (audiobook)
-         return voice_service.select_voice_id('male', 'history') 
-    if 'art' in theme:
-        return voice_service.select_voice_id('female', 'art') # Autumn Veil
-    if 'fun' in personality:
-        return voice_service.select_voice_id('male', 'fun') # Drew!
-        
-    # Default
-    return voice_service.select_voice_id('male', 'friendly') # Henry
+    # Fallback to theme/personality-based keyword rules
+    hits = _THEME_VOICE_RE.findall(theme.lower()) + _PERSONALITY_VOICE_RE.findall(personality)
+    if not hits:
+        return voice_service.select_voice_id(*DEFAULT_VOICE_BUCKET)
+    _, bucket = min(VOICE_RULES[hit] for hit in hits)
+    return voice_service.select_voice_id(*bucket)
 
 tour_manager = TourManager()
 narrator_agent = NarratorAgent()
@@ -63,6 +79,63 @@ director_agent = TourDirectorAgent()
 voice_service = VoiceService()
 
 
+def _get_or_404(tour_id: str) -> TourState:
+    """Look up a live tour, raising a 404 if it doesn't exist or has expired."""
+    tour = tour_manager.get_tour(tour_id)
+    if tour is None:
+        raise HTTPException(status_code=404, detail="Tour not found")
+    return tour
+
+
+# Generated speech shared across tours, keyed by (voice_id, text) and capped by total bytes
+AUDIO_CACHE_MAX_BYTES = 256 * 1024 * 1024
+AUDIO_CACHE: LRUCache = LRUCache(maxsize=AUDIO_CACHE_MAX_BYTES, getsizeof=len)
+
+# Background narration pre-generation per tour (tour_id -> {stop_id: task}); an entry is
+# dropped once its whole batch finishes, so tours that expire aren't kept alive here
+narration_prefetches: dict[str, dict[str, asyncio.Task]] = {}
+
+
+def start_narration_prefetch(tour) -> None:
+    """Generate every stop's narration concurrently in the background, storing each on the tour as it lands."""
+    stops = list(tour.route.stops)
+    tasks = narrator_agent.start_poi_narrations(stops, tour.preferences, tour.llm_semaphore)
+    by_stop = {}
+    for stop, task in zip(stops, tasks):
+        task.add_done_callback(lambda t, stop=stop: _store_prefetched_narration(tour, stop, t))
+        by_stop[stop.id] = task
+    narration_prefetches[tour.id] = by_stop
+
+    def _batch_done(_):
+        if narration_prefetches.get(tour.id) is by_stop:
+            del narration_prefetches[tour.id]
+        print(f"📝 Pre-generated {len(tour.poi_narrations)}/{len(stops)} narrations for tour {tour.id}")
+
+    asyncio.gather(*tasks, return_exceptions=True).add_done_callback(_batch_done)
+
+
+async def take_prefetched_narration(tour, stop) -> Optional[str]:
+    """
+    Claim a stop's pre-generated narration, waiting for its prefetch if it's still running.
+    asyncio.wait never cancels the task, and wakes us after the task's store callback - even when
+    the task is already done, since its callbacks may still be queued, so don't skip it on done().
+    """
+    prefetch = narration_prefetches.get(tour.id, {}).get(stop.id)
+    if prefetch is not None:
+        await asyncio.wait({prefetch})
+    return tour.poi_narrations.pop(stop.id, None)
+
+
+def _store_prefetched_narration(tour, stop, task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    narration = task.exception() or task.result()
+    if isinstance(narration, Exception):
+        print(f"Error pre-generating narration for {stop.name}: {narration}")
+    elif narration not in (FAILURE_MESSAGE, UNAVAILABLE_MESSAGE):
+        tour.poi_narrations[stop.id] = narration
+
+
 class ChatRequest(BaseModel):
     """Request body for chat interactions."""
     message: str
@@ -79,29 +152,86 @@ class CreateTourRequest(BaseModel):
 
 
 class LocationUpdateRequest(BaseModel):
-    """Request body for location updates."""
+    """Request body for location updates (the documented schema; parse_location_update decodes it)."""
+    lat: float
+    lng: float
+
+
+class LocationUpdate(NamedTuple):
     lat: float
     lng: float
 
 
+def _json_body(model: type[BaseModel]) -> dict:
+    """openapi_extra documenting model as the JSON body of a route that decodes it by hand."""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
+
+def _validate_body(model: type[BaseModel], body: bytes) -> BaseModel:
+    """
+    Validate a body the fast path rejected with its Pydantic model, so clients get FastAPI's usual
+    422 error shape (and anything Pydantic accepts still goes through).
+    """
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)], body=body
+        )
+
+
+async def parse_location_update(request: Request) -> LocationUpdate:
+    """Decode a location tick straight from JSON; these arrive every few seconds per user."""
+    body = await request.body()
+    try:
+        data = orjson.loads(body)
+        return LocationUpdate(float(data["lat"]), float(data["lng"]))
+    except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        model = _validate_body(LocationUpdateRequest, body)
+        return LocationUpdate(model.lat, model.lng)
+
+
 class TransitionRequest(BaseModel):
     """Request body for state transitions."""
     new_status: str
 
 
 class ProximityCheckRequest(BaseModel):
-    """Request body for proximity checks."""
-    current_location: list[float]
-    poi_location: list[float]
+    """Request body for proximity checks (the documented schema; parse_proximity_check decodes it)."""
+    current_location: tuple[float, float]
+    poi_location: tuple[float, float]
     threshold: float = 50.0
 
 
-@router.post("/tour/proximity-check")
-async def proximity_check(request: ProximityCheckRequest):
+class ProximityCheck(NamedTuple):
+    current_location: tuple[float, float]
+    poi_location: tuple[float, float]
+    threshold: float
+
+
+async def parse_proximity_check(request: Request) -> ProximityCheck:
+    """Decode a proximity check straight from JSON."""
+    body = await request.body()
+    try:
+        data = orjson.loads(body)
+        current_lat, current_lng = data["current_location"]
+        poi_lat, poi_lng = data["poi_location"]
+        return ProximityCheck(
+            (float(current_lat), float(current_lng)),
+            (float(poi_lat), float(poi_lng)),
+            float(data.get("threshold", 50.0))
+        )
+    except (orjson.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
+        model = _validate_body(ProximityCheckRequest, body)
+        return ProximityCheck(model.current_location, model.poi_location, model.threshold)
+
+
+@router.post("/tour/proximity-check", openapi_extra=_json_body(ProximityCheckRequest))
+async def proximity_check(request: ProximityCheck = Depends(parse_proximity_check)):
     """Check if user is near a POI."""
     is_near = check_poi_proximity(
-        current_location=tuple(request.current_location),
-        poi_coords=tuple(request.poi_location),
+        current_location=request.current_location,
+        poi_coords=request.poi_location,
         threshold_meters=request.threshold
     )
     
@@ -136,34 +266,38 @@ async def create_tour(request: CreateTourRequest):
     if use_dynamic:
         print(f"✨ Custom theme detected: '{request.theme}'. Using dynamic generation.")
 
-    # Generate optimized route
-    route = generate_route(
+    # Generate optimized route (off the event loop: dynamic search makes blocking Places calls)
+    route = await asyncio.to_thread(
+        generate_route,
         start_coords=start_coords,
         theme=request.theme,
         time_budget_minutes=request.tour_length,
         use_dynamic_search=use_dynamic
     )
     tour.route = route
+    tour.voice_id = get_voice_for_tour(tour.preferences.theme, tour.preferences.guide_personality.value)
+
+    # Narrate all stops in the background while the user listens to the intro
+    start_narration_prefetch(tour)
     
-    return {
+    # Returning the response directly skips FastAPI's jsonable_encoder pass over the tour
+    return ORJSONResponse({
         "success": True,
         "tour_id": tour.id,
         "tour": tour.to_dict()
-    }
+    })
 
 
 @router.get("/tour/{tour_id}")
 async def get_tour(tour_id: str):
     """Get the current state of a tour."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
     
-    return {"tour": tour.to_dict()}
+    return ORJSONResponse({"tour": tour.to_dict()})
 
 
-@router.post("/tour/{tour_id}/location")
-async def update_location(tour_id: str, request: LocationUpdateRequest):
+@router.post("/tour/{tour_id}/location", openapi_extra=_json_body(LocationUpdateRequest))
+async def update_location(tour_id: str, request: LocationUpdate = Depends(parse_location_update)):
     """Update user location for a tour and check POI proximity."""
     tour = tour_manager.update_location(tour_id, request.lat, request.lng)
     if not tour:
@@ -173,11 +307,12 @@ async def update_location(tour_id: str, request: LocationUpdateRequest):
     proximity_info = None
     directions = None
     
-    if tour.route.current_stop:
-        stop = tour.route.current_stop
-        
-        # Check proximity using Haversine
-        if check_poi_proximity(current_coords, stop.coordinates, threshold_meters=50):
+    stop = tour.route.current_stop
+    if stop:
+        # Check proximity: bounding box first, Haversine only when it might be a hit
+        if stop.in_bbox(request.lat, request.lng) and check_poi_proximity(
+            current_coords, stop.coordinates, threshold_meters=ARRIVAL_RADIUS_M
+        ):
             proximity_info = {
                 "near_poi": True,
                 "poi_id": stop.id,
@@ -186,32 +321,43 @@ async def update_location(tour_id: str, request: LocationUpdateRequest):
             }
         else:
             # Get walking directions to current stop
-            directions = get_walking_directions(current_coords, stop.coordinates)
+            directions = await get_walking_directions_async(current_coords, stop.coordinates)
+    
+    # Any catalogue POI the user is standing at, not just the current stop
+    try:
+        nearby = [poi["name"] for poi in await nearby_pois(request.lat, request.lng, meters=50)]
+    except FileNotFoundError:
+        nearby = []
     
     return {
         "success": True,
         "current_location": current_coords,
         "proximity": proximity_info,
-        "directions": directions
+        "directions": directions,
+        "nearby_pois": nearby
     }
 
 
+# Plain dict lookup instead of the TourStatus(...) enum constructor
+_STATUS_BY_VALUE = {status.value: status for status in TourStatus}
+
+
 @router.post("/tour/{tour_id}/transition")
 async def transition_state(tour_id: str, request: TransitionRequest):
     """Transition the tour to a new state."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
     
     try:
-        new_status = TourStatus(request.new_status)
+        new_status = _STATUS_BY_VALUE.get(request.new_status)
+        if new_status is None:
+            raise ValueError(f"{request.new_status!r} is not a valid TourStatus")
         tour.transition_to(new_status)
-        return {
+        return ORJSONResponse({
             "success": True,
             "previous_status": tour.status.value,
             "new_status": new_status.value,
             "tour": tour.to_dict()
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -219,16 +365,16 @@ async def transition_state(tour_id: str, request: TransitionRequest):
 @router.post("/tour/{tour_id}/advance")
 async def advance_stop(tour_id: str):
     """Advance to the next stop on the tour."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
     
-    if tour.route.advance():
+    route = tour.route
+    if route.advance():
+        current_stop = route.current_stop
         return {
             "success": True,
-            "current_stop_index": tour.route.current_stop_index,
-            "current_stop": tour.route.current_stop.name if tour.route.current_stop else None,
-            "is_last_stop": tour.route.next_stop is None
+            "current_stop_index": route.current_stop_index,
+            "current_stop": current_stop.name if current_stop else None,
+            "is_last_stop": route.next_stop is None
         }
     else:
         return {
@@ -238,29 +384,39 @@ async def advance_stop(tour_id: str):
         }
 
 
+METERS_PER_DEGREE_LAT = 111320
+
+
+async def nearby_pois(lat: float, lng: float, meters: float) -> list[dict]:
+    """POIs within `meters` of (lat, lng): bisect a latitude band, box on longitude, then Haversine."""
+    store = await load_poi_store_async()
+    dlat = meters / METERS_PER_DEGREE_LAT
+    dlng = meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(lat)))
+    lo = bisect.bisect_left(store["lats"], lat - dlat)
+    hi = bisect.bisect_right(store["lats"], lat + dlat)
+    return [
+        poi for poi in store["lat_sorted"][lo:hi]
+        if abs(poi["coordinates"][1] - lng) <= dlng
+        and haversine_distance((lat, lng), tuple(poi["coordinates"])) <= meters
+    ]
+
+
 @router.get("/pois")
 async def get_pois(theme: Optional[str] = None):
     """Get all available POIs, optionally filtered by theme."""
-    pois_path = Path(__file__).parent.parent / "data" / "pois.json"
-    
     try:
-        with open(pois_path) as f:
-            pois = json.load(f)
-        
-        if theme:
-            pois = [poi for poi in pois if theme in poi.get("themes", [])]
-        
-        return {"pois": pois, "count": len(pois)}
+        store = await load_poi_store_async()
     except FileNotFoundError:
         return {"pois": [], "count": 0, "error": "POI data not found"}
 
+    pois = store["by_theme"].get(theme, []) if theme else store["all"]
+    return ORJSONResponse({"pois": pois, "count": len(pois)})
+
 
 @router.post("/tour/{tour_id}/narrate")
 async def generate_narration(tour_id: str):
     """Generate narration for the current stop or intro."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
     
     # CASE 1: Initial Intro (Before "Start Tour")
     if tour.status == TourStatus.INITIAL:
@@ -271,7 +427,7 @@ async def generate_narration(tour_id: str):
         intro = await narrator_agent.generate_intro(tour.preferences)
         
         # Update state
-        tour.conversation_history.append({"role": "assistant", "content": intro})
+        tour.add_message("assistant", intro)
         tour.narration_progress.script_text = intro
         tour.narration_progress.current_stop_id = "INTRO"
         
@@ -290,17 +446,22 @@ async def generate_narration(tour_id: str):
     if tour.narration_progress.current_stop_id == tour.route.current_stop.id and tour.narration_progress.script_text:
         return {"narration": tour.narration_progress.script_text, "cached": True}
     
-    # Generate new narration (POI only, no intro)
-    narration = await narrator_agent.generate_poi_narration(
-        tour.route.current_stop, 
-        tour.preferences
-    )
+    narration = await take_prefetched_narration(tour, tour.route.current_stop)
+
+    if narration is None:
+        # Generate new narration (POI only, no intro), warming context for the next two stops
+        next_idx = tour.route.current_stop_index + 1
+        narration = await narrator_agent.generate_poi_narration(
+            tour.route.current_stop, 
+            tour.preferences,
+            upcoming=tour.route.stops[next_idx:next_idx + 2]
+        )
     
     # Update state
     tour.narration_progress.current_stop_id = tour.route.current_stop.id
     tour.narration_progress.script_text = narration
     tour.narration_progress.script_position = 0
-    tour.conversation_history.append({"role": "assistant", "content": narration})
+    tour.add_message("assistant", narration)
     
     return {
         "narration": narration,
@@ -310,18 +471,65 @@ async def generate_narration(tour_id: str):
     }
 
 
+async def stream_stop_narration(tour, stop) -> AsyncIterator[str]:
+    """
+    Yield a stop's narration sentence by sentence (shared by the HTTP stream and the WebSocket).
+    The full script is recorded on the tour once it is complete.
+    """
+    # Pre-generated in the background (or about to be): send it in one piece
+    narration = await take_prefetched_narration(tour, stop)
+    if narration is not None:
+        yield narration
+    else:
+        next_idx = tour.route.current_stop_index + 1
+        pieces = []
+        async for sentence in narrator_agent.generate_poi_narration_stream(
+            stop,
+            tour.preferences,
+            upcoming=tour.route.stops[next_idx:next_idx + 2]
+        ):
+            pieces.append(sentence)
+            yield sentence
+        narration = "".join(pieces)
+    
+    # Update state once the full script is known
+    tour.narration_progress.current_stop_id = stop.id
+    tour.narration_progress.script_text = narration
+    tour.narration_progress.script_position = 0
+    tour.add_message("assistant", narration)
+
+
+@router.post("/tour/{tour_id}/narrate/stream")
+async def stream_narration(tour_id: str):
+    """Stream narration for the current stop as plain text, one sentence at a time."""
+    tour = _get_or_404(tour_id)
+    
+    stop = tour.route.current_stop
+    if not stop:
+        raise HTTPException(status_code=400, detail="No current stop")
+    
+    # Already narrated this stop: send the cached script in one piece
+    if tour.narration_progress.current_stop_id == stop.id and tour.narration_progress.script_text:
+        return PlainTextResponse(tour.narration_progress.script_text)
+
+    return StreamingResponse(stream_stop_narration(tour, stop), media_type="text/plain")
+
+
 @router.post("/tour/{tour_id}/chat")
 async def chat(tour_id: str, request: ChatRequest):
     """Handle user questions or replanning requests."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
         
     # Add user message to history
-    tour.conversation_history.append({"role": "user", "content": request.message})
+    tour.add_message("user", request.message)
     
-    # 1. Classify Intent
-    intent = await qa_agent.classify_intent(request.message)
+    # 1. Classify Intent (and answer chat messages in the same LLM call)
+    intent, chat_answer, _ = await qa_agent.handle_message(
+        message=request.message,
+        current_stop=tour.route.current_stop,
+        preferences=tour.preferences,
+        history=tour.recent_history(QA_HISTORY_WINDOW)
+    )
     print(f"🧠 User Intent: {intent}")
     
     # 2. Handle based on intent
@@ -355,24 +563,19 @@ async def chat(tour_id: str, request: ChatRequest):
             "reply": answer,
             "intent": "replan",
             "replan_result": replan_result,
-            "history_length": len(tour.conversation_history)
+            "history_length": tour.history_total
         }
     else:
-        # Normal Q&A
-        answer, _ = await qa_agent.answer_question(
-            question=request.message,
-            current_stop=tour.route.current_stop,
-            preferences=tour.preferences,
-            history=tour.conversation_history
-        )
+        # Normal Q&A (answered alongside classification)
+        answer = chat_answer
         return_data = {
             "reply": answer,
             "intent": "chat",
-            "history_length": len(tour.conversation_history)
+            "history_length": tour.history_total
         }
     
     # Add assistant response to history
-    tour.conversation_history.append({"role": "assistant", "content": answer})
+    tour.add_message("assistant", answer)
     
     return return_data
 
@@ -385,46 +588,93 @@ class AudioRequest(BaseModel):
 @router.post("/tour/{tour_id}/audio")
 async def generate_tour_audio(tour_id: str, request: AudioRequest):
     """Generate audio for the given text."""
-    tour = tour_manager.get_tour(tour_id)
-    if not tour:
-        raise HTTPException(status_code=404, detail="Tour not found")
+    tour = _get_or_404(tour_id)
 
-    # Select dynamic voice based on tour "Character"
-    voice_id = get_voice_for_tour(
+    # Dynamic voice based on tour "Character" (picked at creation)
+    voice_id = tour.voice_id or get_voice_for_tour(
         tour.preferences.theme,  # theme is already a string
         tour.preferences.guide_personality.value
     )
 
-    # Check Cache
-    import hashlib
-    text_hash = hashlib.md5(f"{request.text}-{voice_id}".encode()).hexdigest()
-    
-    if text_hash in tour.audio_cache:
+    # Check Cache (same text in the same voice is reused across tours)
+    cache_key = (voice_id, request.text)
+    cached = AUDIO_CACHE.get(cache_key)
+    if cached is not None:
         print("✅ Cache Hit: Returning saved audio.")
-        return Response(content=tour.audio_cache[text_hash], media_type="audio/mpeg")
+        return Response(content=cached, media_type="audio/mpeg")
 
-    # Generate audio
-    audio_bytes = await voice_service.generate_audio(
+    # Generate audio, forwarding it as it downloads; wait for the first chunk so a failure is still a 500
+    chunks = voice_service.generate_audio_stream(
         request.text, 
         tour.preferences.guide_personality.value, 
         voice_id=voice_id
     )
-    
-    if not audio_bytes:
+    first = await anext(chunks, None)
+    if not first:
         raise HTTPException(status_code=500, detail="Failed to generate audio")
+
+    async def audio_chunks():
+        pieces = [first]
+        yield first
+        async for chunk in chunks:
+            pieces.append(chunk)
+            yield chunk
+        # Store in Cache (a clip bigger than the whole budget just isn't cached)
+        audio_bytes = b"".join(pieces)
+        if len(audio_bytes) <= AUDIO_CACHE.maxsize:
+            AUDIO_CACHE[cache_key] = audio_bytes
         
-    # Store in Cache
-    tour.audio_cache[text_hash] = audio_bytes
-    
-    if not audio_bytes:
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg")
+
+
+@router.post("/tour/{tour_id}/audio/stream")
+async def stream_tour_audio(tour_id: str, request: AudioRequest):
+    """Stream audio for the given text as it is synthesized, instead of after the whole clip."""
+    tour = _get_or_404(tour_id)
+
+    voice_id = tour.voice_id or get_voice_for_tour(
+        tour.preferences.theme,
+        tour.preferences.guide_personality.value
+    )
+
+    # Streamed clips use a different model, so they are cached apart from /audio's
+    cache_key = (voice_id, STREAM_MODEL_ID, request.text)
+    cached = AUDIO_CACHE.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="audio/mpeg")
+
+    if not voice_service.api_key:
         raise HTTPException(status_code=500, detail="Failed to generate audio")
-        
+
+    async def text_chunks():
+        yield request.text
+
+    async def audio_chunks():
+        pieces = []
+        async for chunk in voice_service.stream_audio(text_chunks(), voice_id):
+            pieces.append(chunk)
+            yield chunk
+        audio_bytes = b"".join(pieces)
+        if audio_bytes and len(audio_bytes) <= AUDIO_CACHE.maxsize:
+            AUDIO_CACHE[cache_key] = audio_bytes
+
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg")
+
+
+@router.get("/voices/{name}/preview")
+async def voice_preview(name: str):
+    """A short sample of a guide voice (pre-synthesized at startup)."""
+    audio_bytes = await voice_service.preview_voice(name)
+    if not audio_bytes:
+        raise HTTPException(status_code=404, detail="No preview for this voice")
     return Response(content=audio_bytes, media_type="audio/mpeg")
 
 
 @router.delete("/tour/{tour_id}")
 async def delete_tour(tour_id: str):
     """Delete a tour session."""
+    for prefetch in narration_prefetches.pop(tour_id, {}).values():
+        prefetch.cancel()
     if tour_manager.delete_tour(tour_id):
         return {"success": True, "message": "Tour deleted"}
     raise HTTPException(status_code=404, detail="Tour not found")
@@ -1,9 +1,7 @@
 
 import asyncio
 import json
-import os
 import sys
-import random
 from pathlib import Path
 
 # Add backend to path so we can import agents
@@ -12,7 +10,8 @@ sys.path.append(str(Path(__file__).parent.parent))
 from agents.qa import QAAgent
 from agents.eval import EvalAgent
 from agents.director import TourDirectorAgent
-from services.routing import haversine_distance
+from services.poi_store import load_poi_store
+from services.routing import haversine_distance, haversine_prepared, prepare_coords
 from models.state import POIStop, UserPreferences, GuidePersonality
 
 def calculate_overhead(current_loc, next_stop_loc, suggested_loc):
@@ -25,96 +24,150 @@ def calculate_overhead(current_loc, next_stop_loc, suggested_loc):
     d_direct = haversine_distance(current_loc, next_stop_loc)
     return max(0, d1 + d2 - d_direct)
 
+def calculate_overheads(triples):
+    """
+    Batch version of calculate_overhead over (current, next_stop, suggested) triples.
+    Each distinct coordinate is converted to radians once and reused across all legs.
+    """
+    prepared = {}
+    def prep(coord):
+        key = tuple(coord)
+        if key not in prepared:
+            prepared[key] = prepare_coords(key)
+        return prepared[key]
+
+    overheads = []
+    for current_loc, next_stop_loc, suggested_loc in triples:
+        cur, nxt, sug = prep(current_loc), prep(next_stop_loc), prep(suggested_loc)
+        d1 = haversine_prepared(cur, sug)
+        d2 = haversine_prepared(sug, nxt)
+        d_direct = haversine_prepared(cur, nxt)
+        overheads.append(max(0, d1 + d2 - d_direct))
+    return overheads
+
+# A POI closer than this to the test location is the one the user is standing at
+SAME_SPOT_METERS = 1.0
+
+# Test cases evaluated at once; the Gemini semaphore in services.ai caps the overall request rate
+EVAL_CONCURRENCY = 8
+
+def nearest_other_poi(location, prepared_pois):
+    """
+    The POI nearest to location, skipping any POI at location itself (tests start at a POI).
+    prepared_pois is a list of (poi, prepare_coords(poi coordinates)); ties go to the earlier POI.
+    """
+    here = prepare_coords(tuple(location))
+    best, best_dist = None, float("inf")
+    for poi, coords in prepared_pois:
+        dist = haversine_prepared(here, coords)
+        if SAME_SPOT_METERS < dist < best_dist:
+            best, best_dist = poi, dist
+    return best
+
 async def run_qa_evals(qa_agent, eval_agent, test_cases):
     print(f"\n--- Running {len(test_cases)} QA Evaluations ---")
-    results = []
     
     # Mock preferences
     prefs = UserPreferences(guide_personality=GuidePersonality.FRIENDLY)
+    sem = asyncio.Semaphore(EVAL_CONCURRENCY)
     
-    for i, test in enumerate(test_cases):
-        print(f"[{i+1}/{len(test_cases)}] Testing: {test['query']}")
-        
-        # Mock current stop
-        current_stop = POIStop(
-            id=f"test_{i}",
-            name=test['poi_name'],
-            coordinates=[0, 0], # Not used for wiki search
-            address="Test Address",
-            poi_type="historical",
-            themes=[]
-        )
-        
-        # 1. Get Answer from QAAgent
-        answer, context = await qa_agent.answer_question(test['query'], current_stop, prefs, [])
-        
-        # 2. Evaluate with EvalAgent
-        eval_result = await eval_agent.evaluate_rag(test['query'], answer, context)
-        
-        results.append({
-            "test": test,
-            "answer": answer,
-            "evaluation": eval_result
-        })
+    async def _one_test(i, test):
+        async with sem:
+            print(f"[{i+1}/{len(test_cases)}] Testing: {test['query']}")
+            
+            # Mock current stop
+            current_stop = POIStop(
+                id=f"test_{i}",
+                name=test['poi_name'],
+                coordinates=[0, 0], # Not used for wiki search
+                address="Test Address",
+                poi_type="historical",
+                themes=[]
+            )
+            
+            # 1. Get Answer from QAAgent
+            answer, context = await qa_agent.answer_question(test['query'], current_stop, prefs, [])
+            
+            return {
+                "test": test,
+                "answer": answer,
+                "context": context
+            }
+    
+    results = list(await asyncio.gather(*(_one_test(i, test) for i, test in enumerate(test_cases))))
+    
+    # 2. Evaluate all answers with EvalAgent in one batch
+    eval_results = await eval_agent.evaluate_rag_batch([
+        {"question": r["test"]["query"], "answer": r["answer"], "context": r.pop("context")}
+        for r in results
+    ])
+    for r, eval_result in zip(results, eval_results):
+        r["evaluation"] = eval_result
         
     return results
 
 async def run_replan_evals(eval_agent, director_agent, test_cases):
     print(f"\n--- Running {len(test_cases)} Intent & Replanning Evaluations ---")
     
-    from services.routing import load_pois
-    pois = load_pois()
+    pois = load_poi_store()["all"]
+    prepared_pois = [(poi, prepare_coords(tuple(poi['coordinates']))) for poi in pois]
+    sem = asyncio.Semaphore(EVAL_CONCURRENCY)
     
-    results = []
-    for test in test_cases:
-        query = test['query']
-        print(f"Testing Intent: {query}")
-        
-        # 1. Classify Intent using DirectorAgent
-        intent = await director_agent.extract_replan_request(query)
-        action = intent.get("action")
-        
-        eval_data = {
-            "test": test,
-            "detected_action": action,
-            "evaluation": None
-        }
-        
-        # 2. Only run Stop/Route Evaluation if it's a "find_place" or "change_theme" (i.e. new stop)
-        if action in ["find_place", "change_theme"]:
-            # Use real director search to find candidates
-            candidates = await director_agent.find_nearby_places(intent.get("query") or query, test['current_location'])
+    async def _one_test(test):
+        async with sem:
+            query = test['query']
+            print(f"Testing Intent: {query}")
             
-            if candidates:
-                # Pick the top candidate (the one the system would likely suggest)
-                suggested_poi = candidates[0]
-                
-                # Pick another random POI as a placeholder for the 'next stop' for overhead calculation
-                next_stop_poi = random.choice(pois)
-                
-                current_loc = test['current_location']
-                suggested_loc = suggested_poi['coordinates']
-                next_stop_loc = next_stop_poi['coordinates']
-                
-                overhead = calculate_overhead(current_loc, next_stop_loc, suggested_loc)
-                mock_reasoning = f"Suggested {suggested_poi['name']} because it matches your request."
-                
-                eval_result = await eval_agent.evaluate_replanning(
-                    query, 
-                    suggested_poi['name'], 
-                    mock_reasoning
-                )
+            # 1. Classify Intent using DirectorAgent
+            intent = await director_agent.extract_replan_request(query)
+            action = intent.get("action")
+            
+            eval_data = {
+                "test": test,
+                "detected_action": action,
+                "evaluation": None
+            }
+            judge_item = None
+            
+            # 2. Only run Stop/Route Evaluation if it's a "find_place" or "change_theme" (i.e. new stop)
+            if action in ["find_place", "change_theme"]:
+                # Use real director search to find candidates
+                candidates = await director_agent.find_nearby_places(intent.get("query") or query, test['current_location'])
                 
-                eval_data["suggestion"] = suggested_poi['name']
-                eval_data["overhead_meters"] = round(overhead, 1)
-                eval_data["evaluation"] = eval_result
+                if candidates:
+                    # The 'next stop' for overhead calculation is the closest other POI, as a
+                    # nearest-neighbour route would visit next (deterministic, so reports are comparable)
+                    current_loc = test['current_location']
+                    next_stop_poi = nearest_other_poi(current_loc, prepared_pois) or pois[0]
+                    next_stop_loc = next_stop_poi['coordinates']
+                    
+                    # Score every candidate in one pass and suggest the cheapest detour,
+                    # as the director's insertion ranking would
+                    overheads = calculate_overheads([(current_loc, next_stop_loc, c['coordinates']) for c in candidates])
+                    best = min(range(len(candidates)), key=overheads.__getitem__)
+                    suggested_poi = candidates[best]
+                    
+                    mock_reasoning = f"Suggested {suggested_poi['name']} because it matches your request."
+                    
+                    eval_data["suggestion"] = suggested_poi['name']
+                    eval_data["overhead_meters"] = round(overheads[best], 1)
+                    judge_item = {"preference": query, "suggested_stop": suggested_poi['name'], "reasoning_given": mock_reasoning}
+                else:
+                    print(f"  -> No candidates found for '{query}'. Satisfaction will be 0.")
+                    eval_data["evaluation"] = {"constraint_satisfaction": 0, "reasoning": "No candidates found."}
             else:
-                print(f"  -> No candidates found for '{query}'. Satisfaction will be 0.")
-                eval_data["evaluation"] = {"constraint_satisfaction": 0, "reasoning": "No candidates found."}
-        else:
-            print(f"  -> Action '{action}' does not trigger new stop evaluation.")
-        
-        results.append(eval_data)
+                print(f"  -> Action '{action}' does not trigger new stop evaluation.")
+            
+            return eval_data, judge_item
+    
+    outcomes = await asyncio.gather(*(_one_test(test) for test in test_cases))
+    results = [eval_data for eval_data, _ in outcomes]
+    detours = [(eval_data, item) for eval_data, item in outcomes if item is not None]
+    
+    # Judge every detour at once, concurrently
+    evaluations = await eval_agent.evaluate_replanning_batch([item for _, item in detours])
+    for (eval_data, _), eval_result in zip(detours, evaluations):
+        eval_data["evaluation"] = eval_result
         
     return results
 
@@ -173,4 +226,10 @@ async def main():
     print(f"\nDetailed results saved to {report_path}")
 
 if __name__ == "__main__":
+    # uvloop ships with uvicorn[standard]; fall back to the stock loop where it isn't available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
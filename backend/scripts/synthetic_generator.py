@@ -1,9 +1,17 @@
 
-import json
+import orjson
 import random
-import os
 from pathlib import Path
 
+def _write_records(f, records):
+    """Write records as comma-separated JSON objects, one per line."""
+    separator = b"\n"
+    for record in records:
+        f.write(separator)
+        f.write(orjson.dumps(record))
+        separator = b",\n"
+    f.write(b"\n")
+
 def generate_synthetic_data(num_qa=10, num_replan=10):
     """
     Generate synthetic test cases from pois.json.
@@ -17,13 +25,8 @@ def generate_synthetic_data(num_qa=10, num_replan=10):
         print(f"POIs file not found at {pois_path}!")
         return
     
-    with open(pois_path, 'r') as f:
-        pois = json.load(f)
-    
-    dataset = {
-        "qa_tests": [],
-        "replan_tests": []
-    }
+    with open(pois_path, 'rb') as f:
+        pois = orjson.loads(f.read())
     
     # QA Samples
     qa_templates = [
@@ -34,15 +37,17 @@ def generate_synthetic_data(num_qa=10, num_replan=10):
         "Is {name} worth visiting?"
     ]
     
-    for _ in range(num_qa):
-        poi = random.choice(pois)
-        template = random.choice(qa_templates)
-        query = template.format(name=poi['name'])
-        dataset["qa_tests"].append({
+    # All draws are independent and with replacement, so take each batch in one call
+    poi_picks = random.choices(pois, k=num_qa)
+    template_picks = random.choices(qa_templates, k=num_qa)
+    qa_tests = (
+        {
             "poi_name": poi['name'],
-            "query": query,
+            "query": template.format(name=poi['name']),
             "type": "QA"
-        })
+        }
+        for poi, template in zip(poi_picks, template_picks)
+    )
         
     # Diverse Replan / Chat / Intent Samples
     diverse_queries = [
@@ -63,24 +68,32 @@ def generate_synthetic_data(num_qa=10, num_replan=10):
         ("That's a beautiful building!", "CHAT")
     ]
     
-    for _ in range(num_replan):
-        query_text, expected_action = random.choice(diverse_queries)
-        # Starting point is random POI
-        start_poi = random.choice(pois)
-        dataset["replan_tests"].append({
+    query_picks = random.choices(diverse_queries, k=num_replan)
+    # Starting point is random POI
+    start_picks = random.choices(pois, k=num_replan)
+    replan_tests = (
+        {
             "current_location": start_poi.get("coordinates", [41.8268, -71.4025]),
             "query": query_text,
             "expected_action": expected_action,
             "type": "REPLAN"
-        })
+        }
+        for (query_text, expected_action), start_poi in zip(query_picks, start_picks)
+    )
         
     # Create data directory if it doesn't exist
     data_dir = script_dir.parent / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
     
     output_path = data_dir / "synthetic_tests.json"
-    with open(output_path, "w") as f:
-        json.dump(dataset, f, indent=2)
+    # Stream records straight to disk (one per line) instead of building the whole dataset first;
+    # the file is still a single {"qa_tests": [...], "replan_tests": [...]} JSON document
+    with open(output_path, "wb") as f:
+        f.write(b'{"qa_tests": [')
+        _write_records(f, qa_tests)
+        f.write(b'],\n"replan_tests": [')
+        _write_records(f, replan_tests)
+        f.write(b']}\n')
     
     print(f"Generated {num_qa} QA and {num_replan} Replan tests in {output_path}")
 
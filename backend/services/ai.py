@@ -3,11 +3,18 @@ AI Service wrapper for Google Gemini API.
 Handles client initialization and prompt transmission.
 """
 
+import asyncio
 import os
 import google.generativeai as genai
+from dotenv import dotenv_values
+from functools import lru_cache
+from google.api_core import exceptions as google_exceptions
 from pathlib import Path
+from typing import AsyncIterator, Optional
 
+@lru_cache(maxsize=1)
 def get_api_key():
+    """Resolve the Gemini key once: environment first, then the first .env file that defines it."""
     # Try environment first
     api_key = os.environ.get('NEXT_GEMINI_API_KEY') or os.environ.get('GEMINI_API_KEY')
     if api_key:
@@ -22,15 +29,34 @@ def get_api_key():
     
     for env_file in env_files:
         if env_file.exists():
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if line.startswith('NEXT_GEMINI_API_KEY=') or line.startswith('GEMINI_API_KEY='):
-                        return line.split('=', 1)[1].strip()
+            values = dotenv_values(env_file)
+            api_key = values.get('NEXT_GEMINI_API_KEY') or values.get('GEMINI_API_KEY')
+            if api_key:
+                return api_key
     
     return None
 
+# Retries for rate-limited (429) Gemini calls, with exponential backoff
+MAX_RETRIES = 3
+RETRY_BASE_DELAY_SECONDS = 1.0
+
+# Process-wide cap on in-flight Gemini calls; bursts queue here instead of tripping 429s
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_SEM = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+# Background work (narration prefetch, intro preload) also takes this smaller semaphore, so it can
+# never fill GEMINI_SEM: GEMINI_INTERACTIVE_RESERVED slots always stay free for chat and narrate calls
+GEMINI_INTERACTIVE_RESERVED = int(os.getenv("GEMINI_INTERACTIVE_RESERVED", "3"))
+BACKGROUND_GEMINI_SEM = asyncio.Semaphore(max(1, GEMINI_MAX_CONCURRENCY - GEMINI_INTERACTIVE_RESERVED))
+
+UNAVAILABLE_MESSAGE = "AI service unavailable. Please check API key configuration."
+FAILURE_MESSAGE = "I'm having trouble connecting to my creative circuits right now."
+
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+
 class AIService:
-    def __init__(self):
+    def __init__(self, model_name: str = DEFAULT_MODEL, system_instruction: Optional[str] = None):
         self.api_key = get_api_key()
         if not self.api_key:
             print("⚠️ Warning: No Gemini API key found. AI features will be disabled.")
@@ -39,16 +65,67 @@ class AIService:
             
         genai.configure(api_key=self.api_key)
         # Use updated model name from available list
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
         
-    async def generate_content(self, prompt: str) -> str:
-        """Generate text content from a prompt."""
+    async def generate_content(self, prompt: str, generation_config: Optional[dict] = None) -> str:
+        """Generate text content from a prompt (generation_config enables e.g. JSON mode)."""
         if not self.model:
-            return "AI service unavailable. Please check API key configuration."
+            return UNAVAILABLE_MESSAGE
             
-        try:
-            response = await self.model.generate_content_async(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Error generating content: {e}")
-            return "I'm having trouble connecting to my creative circuits right now."
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with GEMINI_SEM:
+                    response = await self.model.generate_content_async(prompt, generation_config=generation_config)
+                return response.text
+            except google_exceptions.ResourceExhausted as e:
+                if attempt == MAX_RETRIES:
+                    print(f"Error generating content: {e}")
+                    break
+                await _backoff(attempt)
+            except Exception as e:
+                print(f"Error generating content: {e}")
+                break
+
+        return FAILURE_MESSAGE
+
+    async def generate_content_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Generate text content from a prompt, yielding chunks as they arrive."""
+        if not self.model:
+            yield UNAVAILABLE_MESSAGE
+            return
+
+        streamed_any = False
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                # Hold the slot until the stream is drained, since it's one request to Gemini
+                async with GEMINI_SEM:
+                    response = await self.model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        streamed_any = True
+                        yield chunk.text
+                return
+            except google_exceptions.ResourceExhausted as e:
+                # Only retry if nothing has reached the caller yet
+                if streamed_any or attempt == MAX_RETRIES:
+                    print(f"Error streaming content: {e}")
+                    break
+                await _backoff(attempt)
+            except Exception as e:
+                print(f"Error streaming content: {e}")
+                break
+
+        if not streamed_any:
+            yield FAILURE_MESSAGE
+
+
+async def _backoff(attempt: int) -> None:
+    """Sleep before retrying a rate-limited call."""
+    delay = RETRY_BASE_DELAY_SECONDS * 2 ** attempt
+    print(f"⏳ Gemini rate limited, retrying in {delay:.0f}s...")
+    await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=None)
+def get_ai_service(model_name: str = DEFAULT_MODEL, system_instruction: Optional[str] = None) -> AIService:
+    """Return the shared AIService for a (model, system instruction) pair, so agents never rebuild Gemini clients."""
+    return AIService(model_name, system_instruction)
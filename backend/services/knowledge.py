@@ -5,8 +5,14 @@ Provides external data from Wikipedia and Google Maps to enrich AI responses.
 """
 
 import math
+import re
+import orjson
 import os
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
 from typing import Optional, List, Dict
 from dotenv import load_dotenv
 
@@ -14,7 +20,93 @@ load_dotenv()
 
 GOOGLE_MAPS_API_KEY = os.getenv("NEXT_GOOGLE_MAPS_API_KEY")
 
+DIRECTIONS_API_URL = "https://maps.googleapis.com/maps/api/directions/json"
+
+# (connect, read) seconds for the blocking Google Maps calls
+GOOGLE_TIMEOUT = (2, 5)
+
+# Pooled, kept-alive async connections (Wikipedia, and Google Maps from the event loop) shared by every agent
+HTTP_MAX_CONNECTIONS = 16
+
+# Places cache keys snap the location to a ~150m grid cell and normalize the query, so GPS jitter
+# and rephrasings ("coffee", "coffee shop", "cafes") reuse the same results.
+# ~0.0015 deg is ~165m of latitude and ~125m of longitude around Providence
+CELL_SIZE_DEG = 0.0015
+
+# Words that don't change what a place search is looking for
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "of", "for", "with", "some", "any", "me", "us", "find", "get", "nearby", "near", "around",
+    "here", "place", "places", "spot", "spots", "shop", "shops", "good", "nice"
+})
+
+# Common rephrasings mapped onto one canonical word
+SYNONYMS = {
+    "cafe": "coffee",
+    "café": "coffee",
+    "espresso": "coffee",
+    "latte": "coffee",
+    "restroom": "bathroom",
+    "toilet": "bathroom",
+    "washroom": "bathroom",
+    "eat": "food",
+    "restaurant": "food",
+}
+
+
+def _singular(word: str) -> str:
+    """Cheap plural stripping ("galleries" -> "gallery", "museums" -> "museum")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query: str) -> str:
+    """Reduce a search query to a canonical, order-independent form."""
+    words = re.findall(r"\w+", query.lower())
+    terms = {SYNONYMS.get(w, w) for w in (_singular(w) for w in words) if w not in FILLER_WORDS}
+    return " ".join(sorted(terms)) or query.lower().strip()
+
+
+def location_cell(location: tuple[float, float]) -> tuple[int, int]:
+    """Snap a (lat, lng) to its grid cell."""
+    return round(location[0] / CELL_SIZE_DEG), round(location[1] / CELL_SIZE_DEG)
+
+
 class KnowledgeService:
+    # Wikipedia summaries keyed by lowercased query, shared by every agent's KnowledgeService
+    _wiki_cache: TTLCache = TTLCache(maxsize=1024, ttl=86400)
+    # Places text searches keyed by (normalized query, grid cell, radius, open_now); short TTL since open_now goes stale
+    _places_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+    # One pooled async HTTP client for all instances, created on first use
+    _http_client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        if cls._http_client is None:
+            cls._http_client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+            )
+        return cls._http_client
+
+    # One keep-alive requests.Session for the blocking Google Maps calls, shared by all instances
+    _session: Optional[requests.Session] = None
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        if cls._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=20,
+                max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+            )
+            session.mount("https://", adapter)
+            cls._session = session
+        return cls._session
+
     def __init__(self):
         self.wiki_api_url = "https://en.wikipedia.org/w/api.php"
         self.places_api_url = "https://maps.googleapis.com/maps/api/place"
@@ -27,57 +119,45 @@ class KnowledgeService:
         if not self.maps_key:
             print("⚠️ Warning: No Google Maps API key found. RAG features will be limited.")
 
-    def search_wikipedia(self, query: str) -> str:
+    async def search_wikipedia(self, query: str) -> str:
         """
         Search Wikipedia for a summary of the topic.
         Returns a plain text summary or empty string.
         """
-        # First, search for the page title
-        search_params = {
+        cache_key = query.lower().strip()
+        cached = self._wiki_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Search for the best matching page and fetch its intro in a single request
+        params = {
             "action": "query",
-            "list": "search",
-            "srsearch": query,
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": 1,
+            "prop": "extracts",
+            "exintro": True,
+            "explaintext": True,
             "format": "json"
         }
         
         try:
-            # 1. Search Query
-            response = requests.get(self.wiki_api_url, params=search_params, headers=self.headers)
+            response = await self._get_http_client().get(self.wiki_api_url, params=params, headers=self.headers)
             try:
-                data = response.json()
+                data = orjson.loads(response.content)
             except ValueError:
                 print(f"Wikipedia API Error on search: status={response.status_code} text={response.text[:200]}")
                 return ""
             
-            if not data.get("query", {}).get("search"):
-                return ""
-            
-            # Get best match title
-            title = data["query"]["search"][0]["title"]
-            
-            # 2. Get Summary
-            summary_params = {
-                "action": "query",
-                "prop": "extracts",
-                "titles": title,
-                "exintro": True,
-                "explaintext": True,
-                "format": "json"
-            }
-            
-            response = requests.get(self.wiki_api_url, params=summary_params, headers=self.headers)
-            try:
-                data = response.json()
-            except ValueError:
-                print(f"Wikipedia API Error on summary: status={response.status_code} text={response.text[:200]}")
-                return ""
-            
+            summary = ""
             pages = data.get("query", {}).get("pages", {})
             for page_id, page_data in pages.items():
                 if "extract" in page_data:
-                    return f"Source: Wikipedia ({title})\n{page_data['extract']}"
-                    
-            return ""
+                    summary = f"Source: Wikipedia ({page_data.get('title', query)})\n{page_data['extract']}"
+                    break
+
+            self._wiki_cache[cache_key] = summary
+            return summary
             
         except Exception as e:
             print(f"Wikipedia API Unexpected Error: {e}")
@@ -90,9 +170,50 @@ class KnowledgeService:
         """
         if not self.maps_key:
             return []
+
+        cache_key = self._places_cache_key(query, location, radius_meters, open_now)
+        cached = self._places_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        try:
+            response = self._get_session().get(
+                f"{self.places_api_url}/textsearch/json",
+                params=self._places_params(query, location, radius_meters, open_now),
+                timeout=GOOGLE_TIMEOUT
+            )
+            return self._parse_places(orjson.loads(response.content), cache_key)
             
-        url = f"{self.places_api_url}/textsearch/json"
+        except Exception as e:
+            print(f"Places Search Error: {e}")
+            return []
+
+    async def search_places_async(self, query: str, location: tuple[float, float], radius_meters: int = 2000, open_now: bool = False) -> List[Dict]:
+        """search_places over the shared async client, for callers on the event loop."""
+        if not self.maps_key:
+            return []
+
+        cache_key = self._places_cache_key(query, location, radius_meters, open_now)
+        cached = self._places_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         
+        try:
+            response = await self._get_http_client().get(
+                f"{self.places_api_url}/textsearch/json",
+                params=self._places_params(query, location, radius_meters, open_now)
+            )
+            return self._parse_places(orjson.loads(response.content), cache_key)
+            
+        except Exception as e:
+            print(f"Places Search Error: {e}")
+            return []
+
+    @staticmethod
+    def _places_cache_key(query: str, location: tuple[float, float], radius_meters: int, open_now: bool) -> tuple:
+        return (normalize_query(query), location_cell(location), radius_meters, open_now)
+
+    def _places_params(self, query: str, location: tuple[float, float], radius_meters: int, open_now: bool) -> dict:
         params = {
             "query": query,
             "location": f"{location[0]},{location[1]}",
@@ -102,37 +223,33 @@ class KnowledgeService:
         
         if open_now:
             params["opennow"] = "true"
-        
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
+        return params
+
+    def _parse_places(self, data: dict, cache_key: tuple) -> List[Dict]:
+        """Turn a Text Search response into place dicts, caching successful results."""
+        if data.get("status") != "OK":
+            print(f"Google Places API Error: {data.get('status')} - {data.get('error_message')}")
+            return []
             
-            if data.get("status") != "OK":
-                print(f"Google Places API Error: {data.get('status')} - {data.get('error_message')}")
-                return []
-                
-            results = []
-            for item in data.get("results", [])[:40]: # Top 20
-                place = {
-                    "name": item.get("name"),
-                    "address": item.get("formatted_address"),
-                    "rating": item.get("rating"),
-                    "user_ratings_total": item.get("user_ratings_total"),
-                    "place_id": item.get("place_id"),
-                    "types": item.get("types", []),
-                    "coordinates": (
-                        item["geometry"]["location"]["lat"],
-                        item["geometry"]["location"]["lng"]
-                    )
-                }
-                results.append(place)
-                print(place["name"])
-                
-            return results
+        results = []
+        for item in data.get("results", [])[:40]: # Top 20
+            rating = item.get("rating")
+            place = {
+                "name": item.get("name"),
+                "address": item.get("formatted_address"),
+                "rating": float(rating) if rating is not None else None,  # Always float (or None) for callers
+                "user_ratings_total": item.get("user_ratings_total"),
+                "place_id": item.get("place_id"),
+                "types": item.get("types", []),
+                "coordinates": (
+                    item["geometry"]["location"]["lat"],
+                    item["geometry"]["location"]["lng"]
+                )
+            }
+            results.append(place)
             
-        except Exception as e:
-            print(f"Places Search Error: {e}")
-            return []
+        self._places_cache[cache_key] = tuple(results)
+        return results
 
     def get_place_details(self, place_id: str) -> Dict:
         """Get details (reviews, opening hours) for a specific place."""
@@ -147,53 +264,88 @@ class KnowledgeService:
         }
         
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
+            response = self._get_session().get(url, params=params, timeout=GOOGLE_TIMEOUT)
+            data = orjson.loads(response.content)
             return data.get("result", {})
         except Exception as e:
             print(f"Place Details Error: {e}")
             return {}
 
-    def get_directions(self, origin: tuple[float, float], destination: tuple[float, float]) -> Dict:
-        """Get walking directions between two points using Google Directions API."""
+    def get_directions(
+        self,
+        origin: tuple[float, float],
+        destination: tuple[float, float],
+        include_steps: bool = True,
+        include_polyline: bool = True
+    ) -> Dict:
+        """
+        Get walking directions between two points using Google Directions API.
+        Callers that only need distance/duration can skip building steps and the polyline.
+        """
         if not self.maps_key:
             return {}
-            
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            "origin": f"{origin[0]},{origin[1]}",
-            "destination": f"{destination[0]},{destination[1]}",
-            "mode": "walking",
-            "key": self.maps_key
-        }
         
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data.get("status") != "OK":
-                print(f"Directions API Error: {data.get('status')} - {data.get('error_message')}")
-                return {}
-                
-            route = data["routes"][0]
-            leg = route["legs"][0]
+            response = self._get_session().get(
+                DIRECTIONS_API_URL, params=self._directions_params(origin, destination), timeout=GOOGLE_TIMEOUT
+            )
+            return self._parse_directions(orjson.loads(response.content), include_steps, include_polyline)
             
-            return {
-                "distance_meters": leg["distance"]["value"],
-                "duration_minutes": math.ceil(leg["duration"]["value"] / 60),
-                "summary": route["summary"],
-                "steps": [
-                    {
-                        "instruction": step["html_instructions"],
-                        "distance": step["distance"]["value"],
-                        "duration": step["duration"]["value"],
-                        "maneuver": step.get("maneuver")
-                    }
-                    for step in leg["steps"]
-                ],
-                "overview_polyline": route["overview_polyline"]["points"]
-            }
+        except Exception as e:
+            print(f"Directions API Exception: {e}")
+            return {}
+
+    async def get_directions_async(
+        self,
+        origin: tuple[float, float],
+        destination: tuple[float, float],
+        include_steps: bool = True,
+        include_polyline: bool = True
+    ) -> Dict:
+        """get_directions over the shared async client, for callers on the event loop."""
+        if not self.maps_key:
+            return {}
+        
+        try:
+            response = await self._get_http_client().get(
+                DIRECTIONS_API_URL, params=self._directions_params(origin, destination)
+            )
+            return self._parse_directions(orjson.loads(response.content), include_steps, include_polyline)
             
         except Exception as e:
             print(f"Directions API Exception: {e}")
             return {}
+
+    def _directions_params(self, origin: tuple[float, float], destination: tuple[float, float]) -> dict:
+        return {
+            "origin": f"{origin[0]},{origin[1]}",
+            "destination": f"{destination[0]},{destination[1]}",
+            "mode": "walking",
+            "key": self.maps_key
+        }
+
+    @staticmethod
+    def _parse_directions(data: dict, include_steps: bool = True, include_polyline: bool = True) -> Dict:
+        """Flatten the first route of a Directions response (steps/polyline are None when excluded)."""
+        if data.get("status") != "OK":
+            print(f"Directions API Error: {data.get('status')} - {data.get('error_message')}")
+            return {}
+            
+        route = data["routes"][0]
+        leg = route["legs"][0]
+        
+        return {
+            "distance_meters": leg["distance"]["value"],
+            "duration_minutes": math.ceil(leg["duration"]["value"] / 60),
+            "summary": route["summary"],
+            "steps": [
+                {
+                    "instruction": step["html_instructions"],
+                    "distance": step["distance"]["value"],
+                    "duration": step["duration"]["value"],
+                    "maneuver": step.get("maneuver")
+                }
+                for step in leg["steps"]
+            ] if include_steps else None,
+            "overview_polyline": route["overview_polyline"]["points"] if include_polyline else None
+        }
@@ -0,0 +1,66 @@
+"""
+POI Store
+Parsed pois.json plus theme and latitude indexes, shared by the API and the eval scripts.
+The file is re-read only when its mtime changes.
+"""
+
+import asyncio
+import time
+import orjson
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+POIS_PATH = Path(__file__).parent.parent / "data" / "pois.json"
+
+# How often the event-loop path re-checks pois.json's mtime; edits show up within this window
+MTIME_CHECK_INTERVAL_S = 5.0
+
+# Last store handed out, the mtime it was built from, and when that mtime was checked
+_store: Optional[dict] = None
+_store_mtime_ns: Optional[int] = None
+_checked_at = float("-inf")
+
+
+@lru_cache(maxsize=1)
+def _build_store(mtime_ns: int) -> dict:
+    """Read and index pois.json; the mtime argument only keys the cache."""
+    pois = orjson.loads(POIS_PATH.read_bytes())
+    by_theme = {}
+    for poi in pois:
+        for theme in dict.fromkeys(poi.get("themes", [])):
+            by_theme.setdefault(theme, []).append(poi)
+    lat_sorted = sorted(pois, key=lambda poi: poi["coordinates"][0])
+    return {
+        "all": pois,
+        "by_theme": by_theme,
+        "lat_sorted": lat_sorted,
+        "lats": [poi["coordinates"][0] for poi in lat_sorted]
+    }
+
+
+def load_poi_store() -> dict:
+    """
+    Return the indexed POI store: {"all", "by_theme", "lat_sorted", "lats"}.
+    Blocking (a stat, plus a read when the file changed); the contents are shared, so don't mutate them.
+    """
+    global _store, _store_mtime_ns, _checked_at
+    mtime_ns = POIS_PATH.stat().st_mtime_ns
+    _store, _store_mtime_ns, _checked_at = _build_store(mtime_ns), mtime_ns, time.monotonic()
+    return _store
+
+
+async def load_poi_store_async() -> dict:
+    """
+    load_poi_store for the event loop. Between mtime checks (every MTIME_CHECK_INTERVAL_S) the
+    built store is returned directly; only a changed file is re-read, in a worker thread.
+    """
+    global _checked_at
+    if _store is not None:
+        now = time.monotonic()
+        if now - _checked_at < MTIME_CHECK_INTERVAL_S:
+            return _store
+        if POIS_PATH.stat().st_mtime_ns == _store_mtime_ns:
+            _checked_at = now
+            return _store
+    return await asyncio.to_thread(load_poi_store)
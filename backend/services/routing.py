@@ -4,34 +4,79 @@ Handles route generation and optimization for walking tours.
 Uses a greedy nearest-neighbor algorithm for simplicity.
 """
 
-import json
 import math
-from pathlib import Path
-from typing import Optional
-from models.state import POIStop, Route, TourTheme
+from math import asin, cos, radians, sin, sqrt
+from typing import Optional, TypedDict
+from models.state import POIStop, Route
+from services.poi_store import load_poi_store
 
 
 def load_pois() -> list[dict]:
-    """Load POI data from JSON file."""
-    pois_path = Path(__file__).parent.parent / "data" / "pois.json"
-    with open(pois_path) as f:
-        return json.load(f)
+    """Load POI data from JSON file (parsed once per file version by services.poi_store; don't mutate)."""
+    return load_poi_store()["all"]
 
 
+class Candidate(TypedDict, total=False):
+    """A possible route stop: a pois.json entry, or a Places result in the same shape."""
+    id: str
+    name: str
+    coordinates: list[float]  # [lat, lng]
+    address: str
+    poi_type: str
+    themes: list[str]
+    estimated_duration: int  # minutes; routing assumes 8 when missing
+    facts: list[str]
+    interactive_questions: list[str]
+
+
+# Earth's radius in meters
+EARTH_RADIUS_M = 6371000
+
+
+# The distance kernels below call the bare math functions (one global lookup instead of
+# math.<attr>) and square by multiplication instead of ** -- they run per candidate per step
+
 def haversine_distance(coord1: tuple[float, float], coord2: tuple[float, float]) -> float:
     """Calculate distance between two coordinates in meters using Haversine formula."""
-    lat1, lon1 = math.radians(coord1[0]), math.radians(coord1[1])
-    lat2, lon2 = math.radians(coord2[0]), math.radians(coord2[1])
+    lat1, lon1 = radians(coord1[0]), radians(coord1[1])
+    lat2, lon2 = radians(coord2[0]), radians(coord2[1])
     
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
+    half_dlat = sin((lat2 - lat1) / 2)
+    half_dlon = sin((lon2 - lon1) / 2)
     
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
+    a = half_dlat * half_dlat + cos(lat1) * cos(lat2) * half_dlon * half_dlon
+    c = 2 * asin(sqrt(a))
     
-    # Earth's radius in meters
-    r = 6371000
-    return r * c
+    return EARTH_RADIUS_M * c
+
+
+def prepare_coords(coord: tuple[float, float]) -> tuple[float, float, float]:
+    """Pre-convert a coordinate to (lat_rad, lon_rad, cos_lat) for repeated distance checks."""
+    lat, lon = radians(coord[0]), radians(coord[1])
+    return lat, lon, cos(lat)
+
+
+def haversine_prepared(p1: tuple[float, float, float], p2: tuple[float, float, float]) -> float:
+    """Haversine distance in meters between two coordinates from prepare_coords()."""
+    half_dlat = sin((p2[0] - p1[0]) / 2)
+    half_dlon = sin((p2[1] - p1[1]) / 2)
+    a = half_dlat * half_dlat + p1[2] * p2[2] * half_dlon * half_dlon
+    return EARTH_RADIUS_M * 2 * asin(sqrt(a))
+
+
+def haversine_row(origin: tuple[float, float, float], targets: list[tuple[float, float, float]]) -> list[float]:
+    """
+    haversine_prepared from one origin to many prepare_coords() targets.
+    The origin's terms are unpacked once, so each target only pays for its own trig.
+    """
+    lat0, lon0, cos0 = origin
+    row = []
+    for lat, lon, cos_lat in targets:
+        half_dlat = sin((lat - lat0) / 2)
+        half_dlon = sin((lon - lon0) / 2)
+        a = half_dlat * half_dlat + cos0 * cos_lat * half_dlon * half_dlon
+        row.append(EARTH_RADIUS_M * 2 * asin(sqrt(a)))
+    return row
 
 
 def filter_pois_by_theme(pois: list[dict], theme: str) -> list[dict]:
@@ -85,7 +130,7 @@ def generate_route(
         Route object with ordered stops
     """
     
-    candidates = []
+    candidates: list[Candidate] = []
 
     # 1. Dynamic Search (Google Places)
     if use_dynamic_search:
@@ -102,6 +147,7 @@ def generate_route(
             if p.get("rating") and float(p["rating"]) < 3.5:
                 continue
                 
+            # Only the fields routing reads; there are no pre-written facts or questions
             candidates.append({
                 "id": p["place_id"],
                 "name": p["name"],
@@ -109,9 +155,7 @@ def generate_route(
                 "address": p["address"],
                 "poi_type": p["types"][0] if p["types"] else "point_of_interest",
                 "themes": [theme],
-                "estimated_duration": 15, # Default 15 mins for dynamic stops
-                "facts": [], # No pre-written facts
-                "interactive_questions": []
+                "estimated_duration": 15 # Default 15 mins for dynamic stops
             })
             
     # 2. Fallback / Static Data
@@ -136,41 +180,48 @@ def generate_route(
     
     
     # Greedy nearest-neighbor route construction
+    # The loop works on parallel per-candidate lists indexed by position (radian
+    # coordinates, durations, alive flags); a candidate dict is only read when its
+    # stop is committed. Finished or skipped candidates are flagged dead.
+    # Distances from the current position are computed once per position and
+    # reused while candidates that don't fit the time budget are skipped.
     route_stops = []
-    current_pos = start_coords
+    current_pos = prepare_coords(start_coords)
     remaining_time = time_budget_minutes
-    used_ids = set()
+    coords = [prepare_coords(tuple(poi["coordinates"])) for poi in candidates]
+    durations = [poi.get("estimated_duration", 8) for poi in candidates]
+    alive = [True] * len(candidates)
+    indices_by_id = {}
+    for i, poi in enumerate(candidates):
+        indices_by_id.setdefault(poi["id"], []).append(i)
+    
+    distances = haversine_row(current_pos, coords)
     
     # Limit iterations to avoid infinite loops if something goes wrong
-    while candidates and len(route_stops) < max_stops and remaining_time > 10:
+    while len(route_stops) < max_stops and remaining_time > 10:
         # Find nearest unvisited POI
-        best_poi = None
+        best_i = -1
         best_distance = float('inf')
         
-        for poi in candidates:
-            if poi["id"] in used_ids:
-                continue
-            
-            poi_coords = tuple(poi["coordinates"])
-            distance = haversine_distance(current_pos, poi_coords)
-            
-            if distance < best_distance:
+        for i, distance in enumerate(distances):
+            if alive[i] and distance < best_distance:
                 best_distance = distance
-                best_poi = poi
+                best_i = i
         
-        if not best_poi:
+        if best_i < 0:
             break
         
         # Check if we have time for this stop
         travel_time = estimate_walking_time(best_distance)
-        stop_duration = best_poi.get("estimated_duration", 8)
+        stop_duration = durations[best_i]
         
         if travel_time + stop_duration > remaining_time:
             # Skip this POI, might find a closer one
-            candidates.remove(best_poi)
+            alive[best_i] = False
             continue
         
         # Add stop to route
+        best_poi = candidates[best_i]
         poi_stop = POIStop(
             id=best_poi["id"],
             name=best_poi["name"],
@@ -182,15 +233,22 @@ def generate_route(
         )
         route_stops.append(poi_stop)
         
-        # Update state
-        used_ids.add(best_poi["id"])
-        current_pos = tuple(best_poi["coordinates"])
+        # Update state (a visited id also retires any duplicate candidates with that id)
+        for i in indices_by_id[best_poi["id"]]:
+            alive[i] = False
+        current_pos = coords[best_i]
+        distances = haversine_row(current_pos, coords)
         remaining_time -= (travel_time + stop_duration)
-        candidates.remove(best_poi)
     
     return Route(stops=route_stops, destination_coords=end_coords)
 
 
+# Compass points clockwise from north, one per 45-degree bucket
+CARDINAL_DIRECTIONS = ("north", "northeast", "east", "southeast",
+                       "south", "southwest", "west", "northwest")
+BUCKETS_PER_RADIAN = 4 / math.pi
+
+
 def get_walking_directions(
     origin: tuple[float, float],
     destination: tuple[float, float]
@@ -210,7 +268,32 @@ def get_walking_directions(
     except Exception as e:
         print(f"Using fallback directions due to error: {e}")
 
-    # 2. Fallback: Haversine Estimation
+    return estimate_walking_directions(origin, destination)
+
+
+async def get_walking_directions_async(
+    origin: tuple[float, float],
+    destination: tuple[float, float]
+) -> dict:
+    """get_walking_directions without blocking the event loop on the Directions API call."""
+    try:
+        from services.knowledge import KnowledgeService
+        ks = KnowledgeService()
+        directions = await ks.get_directions_async(origin, destination)
+        
+        if directions:
+            return directions
+    except Exception as e:
+        print(f"Using fallback directions due to error: {e}")
+
+    return estimate_walking_directions(origin, destination)
+
+
+def estimate_walking_directions(
+    origin: tuple[float, float],
+    destination: tuple[float, float]
+) -> dict:
+    """Straight-line walking directions, for when the Directions API is unavailable."""
     distance = haversine_distance(origin, destination)
     duration = estimate_walking_time(distance)
     
@@ -221,13 +304,12 @@ def get_walking_directions(
     dlon = lon2 - lon1
     x = math.sin(dlon) * math.cos(lat2)
     y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-    bearing = math.degrees(math.atan2(x, y))
+    bearing_rad = math.atan2(x, y)
     
-    # Convert bearing to cardinal direction
-    directions_list = ["north", "northeast", "east", "southeast", 
-                  "south", "southwest", "west", "northwest"]
-    index = round(bearing / 45) % 8
-    cardinal = directions_list[index]
+    # Convert bearing to cardinal direction: scale to 45-degree buckets, shift positive
+    # (+8) and by half a bucket so int() rounds, then wrap with & 7
+    cardinal = CARDINAL_DIRECTIONS[int(bearing_rad * BUCKETS_PER_RADIAN + 8.5) & 7]
+    bearing = math.degrees(bearing_rad)
     
     return {
         "distance_meters": round(distance),
@@ -1,9 +1,58 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import logging.handlers
 import os
-import requests
+import queue
+import re
+import sys
+import httpx
+import orjson
+import websockets
+from pathlib import Path
+from typing import AsyncIterator, Literal, NamedTuple, Optional
+from functools import lru_cache
+from cachetools import LRUCache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Voice logs; VOICE_LOG_LEVEL=WARNING silences the per-clip messages. They're written to stdout
+# directly until start_log_listener() (called from the app's startup) moves the writes onto a
+# background thread, so request handlers don't block on stdout
+logger = logging.getLogger("voice")
+logger.setLevel(os.getenv("VOICE_LOG_LEVEL", "INFO"))
+logger.propagate = False
+_stdout_handler = logging.StreamHandler(sys.stdout)
+logger.addHandler(_stdout_handler)
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start_log_listener() -> None:
+    """Route voice logs through a queue drained by a background thread."""
+    global _queue_handler, _log_listener
+    if _log_listener is not None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _log_listener = logging.handlers.QueueListener(log_queue, _stdout_handler)
+    _log_listener.start()
+    logger.addHandler(_queue_handler)
+    logger.removeHandler(_stdout_handler)
+
+
+def stop_log_listener() -> None:
+    """Flush queued voice logs, stop the thread and go back to writing directly."""
+    global _queue_handler, _log_listener
+    if _log_listener is None:
+        return
+    logger.addHandler(_stdout_handler)
+    logger.removeHandler(_queue_handler)
+    _log_listener.stop()
+    _queue_handler = _log_listener = None
+
 
 # Expanded Voice Library with Metadata
 
@@ -18,41 +67,189 @@ VOICE_LIBRARY = {
     'drew': {'id': 'iP95p4xoKVk53GoZ742B', 'gender': 'male', 'style': 'energetic', 'tags': ['fun', 'romantic', 'comedy']}, # Drew (Standard)
 }
 
+# Tags are only used for membership tests
+for _voice in VOICE_LIBRARY.values():
+    _voice['tags'] = frozenset(_voice['tags'])
+
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY") or os.getenv("NEXT_ELEVENLABS_API_KEY")
 
+# Synthesis can take several seconds for a long narration
+ELEVENLABS_TIMEOUT = 30.0
+
+TTS_VOICE_SETTINGS = {
+    "stability": 0.5,  # 'Natural' setting (Must be 0.0, 0.5, or 1.0 for v3 alpha)
+    "similarity_boost": 0.75,
+    # "use_speaker_boost": True # Often causes issues with alpha models
+}
+
+
+class ModelConfig(NamedTuple):
+    model_id: str
+    voice_settings: dict
+    strip_tags: bool  # only v3 renders audio tags like [sighs], [laughs]; the others read them out
+    fallback: Optional[str] = None  # model to retry with when this one rejects a request (400)
+
+
+TTSModel = Literal['v3', 'turbo', 'flash']
+MODEL_CONFIGS: dict[str, ModelConfig] = {
+    'v3': ModelConfig("eleven_v3", TTS_VOICE_SETTINGS, strip_tags=False, fallback='turbo'),
+    'turbo': ModelConfig("eleven_turbo_v2_5", TTS_VOICE_SETTINGS, strip_tags=True),
+    'flash': ModelConfig("eleven_flash_v2_5", TTS_VOICE_SETTINGS, strip_tags=True),
+}
+
+# Sample line for voice previews, and how many preview syntheses run at once while warming
+PREVIEW_TEXT = "Hello, this is a preview of my voice."
+PREVIEW_CONCURRENCY = 3
+
+# Download size per chunk when streaming a clip's HTTP response
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Input-streaming (WebSocket) synthesis model; v3 isn't served there
+STREAM_MODEL = 'flash'
+STREAM_MODEL_ID = MODEL_CONFIGS[STREAM_MODEL].model_id
+
+# Rate limits and transient server errors are retried with exponential backoff
+# (0.3s, 0.6s, 1.2s), or after the server's Retry-After when it sends one (capped)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF_S = 0.3
+MAX_RETRY_AFTER_S = 10.0
+
+# Request headers, built once (the API key is already on the client); bodies are encoded with orjson
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_TTS_HEADERS = {"Accept": "audio/mpeg", "Content-Type": "application/json"}
+
+# ~100ms of silence returned for text with nothing to speak (LAME-encoded: 32 kbps, 44.1 kHz, mono)
+_SILENT_MP3 = (Path(__file__).parent.parent / "data" / "silence_100ms.mp3").read_bytes()
+
+# Bracketed audio tags ([sighs], [laughs]); only the v3 model renders them
+_TAG_RE = re.compile(r'\[.*?\]')
+
+# Synthesized clips on disk, content-addressed so identical requests survive restarts
+VOICE_CACHE_DIR = Path(os.getenv("VOICE_CACHE_DIR") or Path(__file__).parent.parent / "cache" / "voice")
+
+
+def _cache_key(*parts) -> str:
+    """Content address (BLAKE2b) of everything that determines a clip's bytes."""
+    return hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+
+
+def _read_cached_clip(key: str) -> Optional[bytes]:
+    try:
+        return (VOICE_CACHE_DIR / f"{key}.mp3").read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write_cached_clip(key: str, audio: bytes):
+    """Write via a temp file so a concurrent reader never sees a partial clip."""
+    try:
+        VOICE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = VOICE_CACHE_DIR / f"{key}.mp3"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(audio)
+        tmp.replace(path)
+    except OSError as e:
+        logger.warning("⚠️ Could not cache clip %s: %s", key, e)
+
+
+# Voices grouped by gender, in library order
+_BY_GENDER: dict[str, list[dict]] = {}
+for _voice in VOICE_LIBRARY.values():
+    _BY_GENDER.setdefault(_voice['gender'], []).append(_voice)
+
+
+# Extra points when a tone calls for a particular voice style
+_STYLE_BONUS: dict[tuple[str, str], int] = {
+    ('spooky', 'deep'): 1,
+    ('fun', 'energetic'): 1,
+}
+
+
+def _score_voice(voice: dict, tone: str) -> int:
+    """Keyword match of a tone against a voice's style and tags, plus any style bonus."""
+    score = 0
+    if tone in voice['style']: score += 2
+    if tone in voice['tags']: score += 2
+    return score + _STYLE_BONUS.get((tone, voice['style']), 0)
+
+
+def _rank_voices(gender: str, tone: str) -> list[tuple[int, str]]:
+    """(score, voice id) for a gender's voices (all voices if none match), best first; ties keep library order."""
+    candidates = _BY_GENDER.get(gender) or list(VOICE_LIBRARY.values())
+    ranked = [(_score_voice(voice, tone), voice['id']) for voice in candidates]
+    ranked.sort(key=lambda scored: -scored[0])
+    return ranked
+
+
+@lru_cache(maxsize=64)
+def _best_voice_id(gender: str, tone: str) -> str:
+    """Select best voice ID based on constraints (memoized; the (gender, tone) domain is tiny)."""
+    return _rank_voices(gender.lower().strip(), tone.lower().strip())[0][1]
+
+
+# Every library gender x every tone the scoring knows about (styles, tags, bonus tones, and
+# the personality styles callers pass), ranked once at import
+_KNOWN_TONES = {'soft', 'strong', 'energetic', 'deep'}
+_KNOWN_TONES.update(tone for tone, _ in _STYLE_BONUS)
+for _voice in VOICE_LIBRARY.values():
+    _KNOWN_TONES.add(_voice['style'])
+    _KNOWN_TONES.update(_voice['tags'])
+_SCORE_MATRIX: dict[tuple[str, str], list[tuple[int, str]]] = {
+    (gender, tone): _rank_voices(gender, tone) for gender in _BY_GENDER for tone in _KNOWN_TONES
+}
+
+
+# Legacy personality -> voice style mapping, for requests that don't name a voice
+_STYLE_MAP = {
+    'friendly': 'soft',
+    'serious': 'strong',
+    'fun': 'energetic',
+    'creepy': 'deep'
+}
+
+
 class VoiceService:
+    # Recent sound effects by content key, up to 32 MiB (TTS clips are held by routes.tour.AUDIO_CACHE)
+    _sfx_cache: LRUCache = LRUCache(maxsize=32 * 1024 * 1024, getsizeof=len)
+    # Syntheses (and streams) running right now by cache key; concurrent identical requests share one API call
+    _inflight: dict[str, asyncio.Future] = {}
+    # One pooled async HTTP client for all instances, created on first use
+    _http_client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        if cls._http_client is None:
+            # The API key is preset on the client; the transport retries failed connects
+            cls._http_client = httpx.AsyncClient(
+                timeout=ELEVENLABS_TIMEOUT,
+                headers={"xi-api-key": ELEVENLABS_API_KEY or ""},
+                transport=httpx.AsyncHTTPTransport(
+                    retries=2,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+                )
+            )
+        return cls._http_client
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared HTTP client (on app shutdown)."""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+
     def __init__(self):
         self.api_key = ELEVENLABS_API_KEY
         if not self.api_key:
-            print("⚠️ Warning: No ElevenLabs API key found. Voice features disabled.")
+            logger.warning("⚠️ Warning: No ElevenLabs API key found. Voice features disabled.")
 
     def select_voice_id(self, gender: str, tone: str) -> str:
-        """Select best voice ID based on constraints."""
-        # Normalize inputs
-        gender = gender.lower().strip()
-        tone = tone.lower().strip()
-        
-        candidates = [v for k, v in VOICE_LIBRARY.items() if v['gender'] == gender]
-        if not candidates:
-            candidates = list(VOICE_LIBRARY.values())
-            
-        # Simple keyword matching for tone
-        best_match = candidates[0]
-        max_score = -1
-        
-        for voice in candidates:
-            score = 0
-            if tone in voice['style']: score += 2
-            if tone in voice['tags']: score += 2
-            if tone == 'spooky' and voice['style'] == 'deep': score += 1
-            if tone == 'fun' and voice['style'] == 'energetic': score += 1
-            
-            if score > max_score:
-                max_score = score
-                best_match = voice
-                
-        return best_match['id']
+        """Select best voice ID based on constraints (a table lookup for known pairs)."""
+        ranked = _SCORE_MATRIX.get((gender, tone))
+        if ranked is None:
+            return _best_voice_id(gender, tone)
+        return ranked[0][1]
 
 
     async def generate_sound_effect(self, text: str, duration_seconds: int = 4) -> bytes:
@@ -60,13 +257,16 @@ class VoiceService:
         if not self.api_key:
             return None
 
+        key = _cache_key("sfx", text, duration_seconds)
+        cached = self._sfx_cache.get(key)
+        if cached is None:
+            cached = await asyncio.to_thread(_read_cached_clip, key)
+        if cached is not None:
+            self._sfx_cache[key] = cached
+            return cached
+
         url = "https://api.elevenlabs.io/v1/sound-generation"
         
-        headers = {
-            "Content-Type": "application/json",
-            "xi-api-key": self.api_key
-        }
-        
         data = {
             "text": text,
             "duration_seconds": duration_seconds,
@@ -74,76 +274,268 @@ class VoiceService:
         }
 
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = await self._post(url, data)
             if response.status_code == 200:
-                print(f"✅ Generated SFX: '{text}'")
+                logger.info("✅ Generated SFX: '%s'", text)
+                self._sfx_cache[key] = response.content
+                await asyncio.to_thread(_write_cached_clip, key, response.content)
                 return response.content
             else:
-                print(f"❌ ElevenLabs SFX Error: {response.status_code} - {response.text}")
+                logger.error("❌ ElevenLabs SFX Error: %s - %s", response.status_code, response.text)
                 return None
         except Exception as e:
-            print(f"SFX Generation Failed: {e}")
-            return None
-
-    async def generate_audio(self, text: str, personality: str = 'friendly', voice_id: str = None) -> bytes:
-        """Generate audio from text using ElevenLabs API. Strips [SFX] tags before TTS."""
-        if not self.api_key:
+            logger.error("SFX Generation Failed: %s", e)
             return None
 
+    def _tts_target(self, text: str, personality: str, voice_id: Optional[str], config: ModelConfig) -> tuple[str, str, str]:
+        """The text to send, the voice to use, and the clip's disk-cache key for a TTS request."""
         # Audio tags like [sighs], [laughs] are passed through to v3 model
         # They will be rendered as vocal expressions
         clean_text = text.strip()
+        if config.strip_tags and '[' in clean_text:
+            clean_text = _TAG_RE.sub('', clean_text)
 
         # Determine voice ID
         if not voice_id:
              # Fallback to legacy mapping if no specific ID provided
-             # Map personality enum to style
-             style_map = {
-                 'friendly': 'soft',
-                 'serious': 'strong',
-                 'fun': 'energetic', 
-                 'creepy': 'deep' 
-             }
              # Default to female/soft if unknown
-             voice_id = self.select_voice_id('female', style_map.get(personality, 'soft'))
+             voice_id = self.select_voice_id('female', _STYLE_MAP.get(personality, 'soft'))
         
+        key = _cache_key(
+            voice_id, config.model_id, config.voice_settings["stability"], config.voice_settings["similarity_boost"], clean_text
+        )
+        return clean_text, voice_id, key
+
+    async def generate_audio(self, text: str, personality: str = 'friendly', voice_id: str = None, model: TTSModel = 'v3') -> bytes:
+        """Generate audio from text using ElevenLabs API (audio tags are removed for models that can't render them)."""
+        if not self.api_key:
+            return None
+
+        config = MODEL_CONFIGS[model]
+        clean_text, voice_id, key = self._tts_target(text, personality, voice_id, config)
+        if not clean_text.strip():
+            return _SILENT_MP3
+        return await self._single_flight(key, lambda: self._synthesize(clean_text, voice_id, key, config))
+
+    def _single_flight(self, key: str, make_coro) -> asyncio.Future:
+        """Run make_coro() once per key at a time; concurrent callers with that key await the same run."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release_inflight(key, t))
+        # Shielded so one caller going away doesn't cancel the others' synthesis
+        return asyncio.shield(task)
+
+    async def _synthesize(self, clean_text: str, voice_id: str, key: str, config: ModelConfig) -> Optional[bytes]:
+        # Disk tier; the route keeps recent clips in memory
+        cached = await asyncio.to_thread(_read_cached_clip, key)
+        if cached is not None:
+            return cached
+
         url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
         
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": self.api_key
-        }
-        
         data = {
             "text": clean_text,
-            "model_id": "eleven_v3", # v3 model supports audio tags like [sighs], [laughs]
-            "voice_settings": {
-                "stability": 0.5,  # 'Natural' setting (Must be 0.0, 0.5, or 1.0 for v3 alpha)
-                "similarity_boost": 0.75,
-                # "use_speaker_boost": True # Often causes issues with alpha models
-            }
+            "model_id": config.model_id,
+            "voice_settings": config.voice_settings
         }
 
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = await self._post_with_model_fallback(url, data, config)
             if response.status_code == 200:
-                print(f"✅ Generated audio (Flash) for text: '{clean_text[:20]}...'")
+                logger.info("✅ Generated audio (%s) for text: '%.20s...'", config.model_id, clean_text)
+                await asyncio.to_thread(_write_cached_clip, key, response.content)
                 return response.content
-            else:
-                print(f"\n❌ ElevenLabs Error: {response.status_code} - {response.text}")
-                # Fallback to Turbo v2.5 if v3 fails
-                if response.status_code == 400:
-                   print("⚠️ v3 model failed, retrying with Turbo v2.5...")
-                   data["model_id"] = "eleven_turbo_v2_5"
-                   # Remove tags from text for non-v3 models as they might read them out
-                   import re
-                   data["text"] = re.sub(r'\[.*?\]', '', clean_text) 
-                   retry = requests.post(url, json=data, headers=headers)
-                   if retry.status_code == 200:
-                       return retry.content
-                       
-                return None
+            return None
         except Exception as e:
-            print(f"Voice Generation Failed: {e}")
+            logger.error("Voice Generation Failed: %s", e)
             return None
+
+    async def _post(self, url: str, data: dict, headers: dict = _JSON_HEADERS) -> httpx.Response:
+        """POST to ElevenLabs, retrying rate limits and transient server errors with backoff."""
+        client = self._get_http_client()
+        body = orjson.dumps(data)
+        for attempt in range(MAX_RETRIES + 1):
+            response = await client.post(url, content=body, headers=headers)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            delay = RETRY_BACKOFF_S * 2 ** attempt
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(max(delay, float(retry_after)), MAX_RETRY_AFTER_S)
+            logger.info("⏳ ElevenLabs %s, retrying in %.1fs", response.status_code, delay)
+            await asyncio.sleep(delay)
+
+    async def _post_with_model_fallback(self, url: str, data: dict, config: ModelConfig) -> httpx.Response:
+        """TTS POST, downgrading to the model's fallback (e.g. v3 -> Turbo v2.5) if it rejects the request."""
+        response = await self._post(url, data, _TTS_HEADERS)
+        if response.status_code == 200:
+            return response
+        logger.error("❌ ElevenLabs Error: %s - %s", response.status_code, response.text)
+        if response.status_code != 400 or config.fallback is None:
+            return response
+
+        fallback = MODEL_CONFIGS[config.fallback]
+        logger.warning("⚠️ %s failed, retrying with %s...", config.model_id, fallback.model_id)
+        text = data["text"]
+        # Remove tags from text for non-v3 models as they might read them out
+        if fallback.strip_tags and '[' in text:
+            text = _TAG_RE.sub('', text)
+        data = {"text": text, "model_id": fallback.model_id, "voice_settings": fallback.voice_settings}
+        return await self._post(url, data, _TTS_HEADERS)
+
+    async def generate_audio_batch(
+        self, texts: list[str], voice_id: str, personality: str = 'friendly', model: TTSModel = 'v3'
+    ) -> list[Optional[bytes]]:
+        """
+        generate_audio for several lines in one voice, synthesized concurrently over the pooled
+        client (so the batch takes about as long as its slowest line). Repeated lines are requested once.
+        """
+        unique = list(dict.fromkeys(texts))
+        clips = await asyncio.gather(*(self.generate_audio(text, personality, voice_id=voice_id, model=model) for text in unique))
+        by_text = dict(zip(unique, clips))
+        return [by_text[text] for text in texts]
+
+    async def preview_voice(self, name: str) -> Optional[bytes]:
+        """The preview clip for a VOICE_LIBRARY voice (a disk-cache read once warmed)."""
+        voice = VOICE_LIBRARY.get(name)
+        if voice is None:
+            return None
+        return await self.generate_audio(PREVIEW_TEXT, voice_id=voice['id'])
+
+    async def prewarm_previews(self):
+        """Synthesize any preview clips not already on disk, a few at a time to respect rate limits."""
+        if not self.api_key:
+            return
+        sem = asyncio.Semaphore(PREVIEW_CONCURRENCY)
+
+        async def _one(name):
+            async with sem:
+                return await self.preview_voice(name)
+
+        clips = await asyncio.gather(*(_one(name) for name in VOICE_LIBRARY))
+        logger.info("🔥 Voice previews ready: %d/%d", sum(1 for clip in clips if clip), len(clips))
+
+    async def generate_audio_stream(
+        self, text: str, personality: str = 'friendly', voice_id: str = None, model: TTSModel = 'v3'
+    ) -> AsyncIterator[bytes]:
+        """
+        generate_audio, yielding the MP3 as it downloads instead of after the whole body.
+        A failed request falls back to generate_audio (and its model fallback); an error after
+        audio was yielded is raised so callers don't keep a truncated clip.
+        """
+        if not self.api_key:
+            return
+
+        config = MODEL_CONFIGS[model]
+        clean_text, voice_id, key = self._tts_target(text, personality, voice_id, config)
+        if not clean_text.strip():
+            yield _SILENT_MP3
+            return
+
+        # Already being synthesized or streamed by another request: share that result
+        if key in self._inflight:
+            audio_bytes = await self._single_flight(key, None)
+            if audio_bytes:
+                yield audio_bytes
+                return
+
+        # Register this stream before any await, so identical requests arriving meanwhile wait for
+        # its audio instead of paying for their own
+        shared = asyncio.get_running_loop().create_future()
+        self._inflight[key] = shared
+        audio_bytes = None
+        try:
+            cached = await asyncio.to_thread(_read_cached_clip, key)
+            if cached is not None:
+                shared.set_result(cached)
+                yield cached
+                return
+
+            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream"
+            data = {
+                "text": clean_text,
+                "model_id": config.model_id,
+                "voice_settings": config.voice_settings
+            }
+
+            pieces = []
+            try:
+                async with self._get_http_client().stream("POST", url, content=orjson.dumps(data), headers=_TTS_HEADERS) as response:
+                    if response.status_code == 200:
+                        async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                            pieces.append(chunk)
+                            yield chunk
+                    else:
+                        await response.aread()
+                        logger.error("❌ ElevenLabs Stream Error: %s - %s", response.status_code, response.text)
+            except Exception as e:
+                logger.error("Voice Streaming Failed: %s", e)
+                if pieces:
+                    raise
+
+            if pieces:
+                logger.info("✅ Streamed audio for text: '%.20s...'", clean_text)
+                audio_bytes = b"".join(pieces)
+                shared.set_result(audio_bytes)
+                await asyncio.to_thread(_write_cached_clip, key, audio_bytes)
+            else:
+                # Step aside first: generate_audio single-flights on the same key
+                self._release_inflight(key, shared)
+                audio_bytes = await self.generate_audio(text, personality, voice_id=voice_id, model=model)
+                shared.set_result(audio_bytes)
+                if audio_bytes:
+                    yield audio_bytes
+        finally:
+            # Failed or abandoned mid-stream: waiters get None and synthesize for themselves
+            self._release_inflight(key, shared)
+            if not shared.done():
+                shared.set_result(None)
+
+    def _release_inflight(self, key: str, future: asyncio.Future) -> None:
+        """Drop key's in-flight entry if it is still future (a newer run may have replaced it)."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def stream_audio(self, text_chunks: AsyncIterator[str], voice_id: str) -> AsyncIterator[bytes]:
+        """
+        Stream MP3 audio over ElevenLabs' input-streaming WebSocket while text is still arriving.
+        Yields audio chunks as they are synthesized; yields nothing if voice is disabled or the stream fails.
+        """
+        if not self.api_key:
+            return
+
+        config = MODEL_CONFIGS[STREAM_MODEL]
+        url = f"wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream-input?model_id={config.model_id}"
+
+        try:
+            async with websockets.connect(url) as ws:
+                async def send_text():
+                    # Opening message carries the settings and key; an empty text closes the input
+                    await ws.send(orjson.dumps({
+                        "text": " ",
+                        "voice_settings": config.voice_settings,
+                        "xi_api_key": self.api_key
+                    }).decode())
+                    async for chunk in text_chunks:
+                        if config.strip_tags and '[' in chunk:
+                            chunk = _TAG_RE.sub('', chunk)
+                        if chunk.strip():
+                            await ws.send(orjson.dumps({"text": chunk + " ", "try_trigger_generation": True}).decode())
+                    await ws.send('{"text": ""}')
+
+                sender = asyncio.create_task(send_text())
+                try:
+                    async for message in ws:
+                        data = orjson.loads(message)
+                        if data.get("audio"):
+                            yield base64.b64decode(data["audio"])
+                        if data.get("isFinal"):
+                            break
+                    await sender
+                finally:
+                    sender.cancel()
+            logger.info("✅ Streamed audio for voice %s", voice_id)
+        except Exception as e:
+            logger.error("Voice Streaming Failed: %s", e)
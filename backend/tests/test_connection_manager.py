@@ -0,0 +1,75 @@
+import asyncio
+
+import orjson
+
+from main import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(orjson.loads(text))
+
+
+def _connected(tour_id: str, patches: bool = True) -> tuple[ConnectionManager, FakeWebSocket]:
+    manager, websocket = ConnectionManager(), FakeWebSocket()
+    asyncio.run(manager.connect(tour_id, websocket, patches=patches))
+    return manager, websocket
+
+
+def test_first_send_is_full_state_then_patches():
+    manager, websocket = _connected("t1")
+    asyncio.run(manager.send_tour_state("t1", {"status": "traveling", "current_stop_index": 0}))
+    asyncio.run(manager.send_tour_state("t1", {"status": "poi", "current_stop_index": 0}))
+
+    assert websocket.sent == [
+        {"type": "tour_state", "state": {"status": "traveling", "current_stop_index": 0}},
+        {"type": "tour_state_patch", "changes": {"status": "poi"}},
+    ]
+
+
+def test_clients_without_patches_get_full_state_on_change():
+    manager, websocket = _connected("t1", patches=False)
+    asyncio.run(manager.send_tour_state("t1", {"status": "traveling", "current_stop_index": 0}))
+    asyncio.run(manager.send_tour_state("t1", {"status": "traveling", "current_stop_index": 0}))
+    asyncio.run(manager.send_tour_state("t1", {"status": "poi", "current_stop_index": 0}))
+
+    assert websocket.sent == [
+        {"type": "tour_state", "state": {"status": "traveling", "current_stop_index": 0}},
+        {"type": "tour_state", "state": {"status": "poi", "current_stop_index": 0}},
+    ]
+
+
+def test_unchanged_state_sends_nothing():
+    manager, websocket = _connected("t1")
+    state = {"status": "traveling", "current_stop_index": 0}
+    asyncio.run(manager.send_tour_state("t1", state))
+    asyncio.run(manager.send_tour_state("t1", dict(state)))
+
+    assert len(websocket.sent) == 1
+
+
+def test_reconnect_resends_full_state():
+    manager, websocket = _connected("t1")
+    state = {"status": "traveling"}
+    asyncio.run(manager.send_tour_state("t1", state))
+
+    manager.disconnect("t1")
+    new_websocket = FakeWebSocket()
+    asyncio.run(manager.connect("t1", new_websocket))
+    asyncio.run(manager.send_tour_state("t1", state))
+
+    assert new_websocket.sent == [{"type": "tour_state", "state": state}]
+
+
+def test_send_without_connection_is_a_no_op():
+    manager, websocket = _connected("t1")
+    asyncio.run(manager.send_tour_state("missing", {"status": "traveling"}))
+
+    assert websocket.sent == []
+    assert "missing" not in manager.last_state
@@ -0,0 +1,30 @@
+import orjson
+import pytest
+
+from agents.base import extract_json
+
+
+def test_plain_object():
+    assert extract_json('{"action": "skip_stop"}') == {"action": "skip_stop"}
+
+
+def test_object_inside_markdown_fence_and_chatter():
+    text = 'Sure! Here you go:\n```json\n{"intent": "CHAT", "answer": "Hi"}\n```\nAnything else?'
+    assert extract_json(text) == {"intent": "CHAT", "answer": "Hi"}
+
+
+def test_nested_braces_are_kept():
+    assert extract_json('x {"a": {"b": 1}} y') == {"a": {"b": 1}}
+
+
+@pytest.mark.parametrize("text", ["no json here", "{not json}", ""])
+def test_invalid_json_raises(text):
+    with pytest.raises(orjson.JSONDecodeError):
+        extract_json(text)
+
+
+@pytest.mark.parametrize("text", ["[1, 2]", '"skip"', "42", "null", "true"])
+def test_non_object_json_raises(text):
+    # Callers fall back on JSONDecodeError, so anything but an object must raise it too
+    with pytest.raises(orjson.JSONDecodeError):
+        extract_json(text)
@@ -0,0 +1,42 @@
+import pytest
+
+from agents.director import INTENT_CACHE_MAX_MESSAGE_CHARS, _fast_intent
+
+
+@pytest.mark.parametrize("message", ["skip this one", "next stop please", "Skip"])
+def test_skip_commands(message):
+    assert _fast_intent(message)["action"] == "skip_stop"
+
+
+@pytest.mark.parametrize("message", ["end the tour", "I'm done, end tour"])
+def test_end_commands(message):
+    assert _fast_intent(message)["action"] == "end_tour"
+
+
+def test_place_keyword_maps_to_canonical_query():
+    intent = _fast_intent("need a cafe")
+    assert intent["action"] == "find_place"
+    assert intent["query"] == "coffee shop"
+
+
+@pytest.mark.parametrize("message", [
+    "don't skip this one",
+    "do not end the tour",
+    "never skip",
+    "I can't find coffee",
+    "no coffee",
+])
+def test_negated_commands_go_to_the_llm(message):
+    assert _fast_intent(message) is None
+
+
+def test_conflicting_rules_go_to_the_llm():
+    assert _fast_intent("skip this and end the tour") is None
+
+
+def test_long_messages_go_to_the_llm():
+    assert _fast_intent("skip " + "x" * INTENT_CACHE_MAX_MESSAGE_CHARS) is None
+
+
+def test_unrecognized_messages_go_to_the_llm():
+    assert _fast_intent("tell me about the architecture") is None
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import routes.tour as tour_routes
+from agents.narrator import NarratorAgent
+from models.state import POIStop, Route, TourStatus, UserPreferences
+from services.ai import FAILURE_MESSAGE
+
+
+def _stop(i: int) -> POIStop:
+    return POIStop(f"s{i}", f"Stop {i}", (41.82 + i * 0.001, -71.41), f"{i} Main St", "landmark")
+
+
+async def _settle():
+    """Let done callbacks (per-stop stores, then the batch cleanup) run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def tour():
+    tour = tour_routes.tour_manager.create_tour({})
+    tour.route = Route(stops=[_stop(i) for i in range(3)])
+    tour.status = TourStatus.TRAVELING
+    yield tour
+    tour_routes.tour_manager.delete_tour(tour.id)
+    tour_routes.narration_prefetches.pop(tour.id, None)
+
+
+@pytest.fixture
+def gates(monkeypatch):
+    """One event per stop; a stop's narration finishes only once its gate is set."""
+    gates: dict[str, asyncio.Event] = {}
+
+    async def fake_generate(poi, preferences, upcoming=None):
+        await gates.setdefault(poi.id, asyncio.Event()).wait()
+        return FAILURE_MESSAGE if poi.id == "s2" else f"narration for {poi.name}"
+
+    monkeypatch.setattr(tour_routes.narrator_agent, "generate_poi_narration", fake_generate)
+    monkeypatch.setattr(tour_routes.narrator_agent, "prefetch_wiki_facts", lambda pois: None)
+    return gates
+
+
+def _open(gates, *stop_ids):
+    for stop_id in stop_ids:
+        gates.setdefault(stop_id, asyncio.Event()).set()
+
+
+def test_narrate_waits_only_for_the_current_stop(tour, gates):
+    async def run():
+        tour_routes.start_narration_prefetch(tour)
+        _open(gates, "s0")
+
+        result = await asyncio.wait_for(tour_routes.generate_narration(tour.id), timeout=1)
+        assert result["narration"] == "narration for Stop 0"
+        assert not tour_routes.narration_prefetches[tour.id]["s1"].done()
+
+        _open(gates, "s1", "s2")
+        await _settle()
+
+    asyncio.run(run())
+    # Batch finished: the tour's entry is dropped, failed stops aren't stored
+    assert tour.id not in tour_routes.narration_prefetches
+    assert tour.poi_narrations == {"s1": "narration for Stop 1"}
+
+
+def test_delete_tour_cancels_pending_prefetches(tour, gates):
+    async def run():
+        tour_routes.start_narration_prefetch(tour)
+        tasks = list(tour_routes.narration_prefetches[tour.id].values())
+
+        await tour_routes.delete_tour(tour.id)
+        await _settle()
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert all(task.cancelled() for task in tasks)
+    assert tour.id not in tour_routes.narration_prefetches
+    assert tour.poi_narrations == {}
+
+
+def test_shared_wiki_lookup_survives_a_cancelled_caller(monkeypatch):
+    narrator = NarratorAgent()
+    release = None
+
+    async def fake_search(query):
+        await release.wait()
+        return f"facts about {query}"
+
+    monkeypatch.setattr(narrator.knowledge_service, "search_wikipedia", fake_search)
+    stop, preferences = _stop(0), UserPreferences()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        cancelled = asyncio.create_task(narrator._build_poi_prompt(stop, preferences))
+        survivor = asyncio.create_task(narrator._build_poi_prompt(stop, preferences))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await survivor, cancelled.cancelled()
+
+    prompt, was_cancelled = asyncio.run(run())
+    assert was_cancelled
+    assert "facts about Stop 0" in prompt
+
+
+def test_cancelled_wiki_lookup_is_not_reused(monkeypatch):
+    narrator = NarratorAgent()
+
+    async def fake_search(query):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(narrator.knowledge_service, "search_wikipedia", fake_search)
+
+    async def run():
+        task = narrator._fetch_wiki_facts("Stop 0")
+        await asyncio.sleep(0)
+        task.cancel()
+        await _settle()
+
+    asyncio.run(run())
+    assert "Stop 0" not in narrator._wiki_tasks
+
+
+def test_stream_waits_for_the_in_flight_prefetch(tour, gates, monkeypatch):
+    async def no_stream(*args, **kwargs):
+        raise AssertionError("narration was generated again")
+        yield
+
+    monkeypatch.setattr(tour_routes.narrator_agent, "generate_poi_narration_stream", no_stream)
+
+    async def run():
+        tour_routes.start_narration_prefetch(tour)
+        stream = tour_routes.stream_stop_narration(tour, tour.route.stops[0])
+        first = asyncio.create_task(anext(stream))
+        await _settle()
+        assert not first.done()
+
+        _open(gates, "s0", "s1", "s2")
+        return await asyncio.wait_for(first, timeout=1)
+
+    assert asyncio.run(run()) == "narration for Stop 0"
+    assert "s0" not in tour.poi_narrations
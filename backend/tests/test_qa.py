@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from cachetools import LRUCache
+
+from agents.base import BaseAgent
+from agents.qa import QAAgent
+from models.state import POIStop, UserPreferences
+
+STOP = POIStop("s0", "State House", (41.831, -71.415), "82 Smith St", "landmark")
+
+
+class FakeAI:
+    def __init__(self, response: str):
+        self.response = response
+        self.prompts: list[str] = []
+
+    async def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return self.response
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(BaseAgent, "_response_cache", LRUCache(maxsize=16))
+    agent = QAAgent()
+    agent.ai = FakeAI('{"intent": "CHAT", "answer": "Built in 1904."}')
+    agent.wiki_lookups = []
+
+    async def fake_search(query):
+        agent.wiki_lookups.append(query)
+        return "The State House was completed in 1904."
+
+    monkeypatch.setattr(agent.knowledge_service, "search_wikipedia", fake_search)
+    return agent
+
+
+def _handle(agent, message: str):
+    return asyncio.run(agent.handle_message(message, STOP, UserPreferences(), []))
+
+
+def test_repeated_message_reuses_the_cached_answer(agent):
+    first = _handle(agent, "When was this built?")
+    second = _handle(agent, "When was this built?")
+
+    assert first == second == ("CHAT", "Built in 1904.", "The State House was completed in 1904.")
+    assert len(agent.ai.prompts) == 1
+
+
+@pytest.mark.parametrize("message", ["skip this one", "find coffee", "end the tour"])
+def test_obvious_commands_skip_the_lookup_and_llm(agent, message):
+    assert _handle(agent, message) == ("REPLAN", "", "")
+    assert agent.ai.prompts == []
+    assert agent.wiki_lookups == []
+
+
+def test_ambiguous_messages_still_go_to_the_llm(agent):
+    agent.ai.response = '{"intent": "REPLAN"}'
+
+    assert _handle(agent, "don't skip this one, just add a cafe")[0] == "REPLAN"
+    assert len(agent.ai.prompts) == 1
@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("path, model", [
+    ("/api/tour/{tour_id}/location", "LocationUpdateRequest"),
+    ("/api/tour/proximity-check", "ProximityCheckRequest"),
+])
+def test_hand_decoded_bodies_are_documented(path, model):
+    body = client.get("/openapi.json").json()["paths"][path]["post"]["requestBody"]
+    assert body["content"]["application/json"]["schema"]["title"] == model
+
+
+def test_proximity_check_fast_path():
+    response = client.post(
+        "/api/tour/proximity-check", json={"current_location": [41.82, -71.41], "poi_location": [41.82, -71.41]}
+    )
+    assert response.json() == {"is_near": True, "threshold_meters": 50.0}
+
+
+@pytest.mark.parametrize("body, loc", [
+    ({"lat": "north", "lng": -71.41}, ["body", "lat"]),
+    ({"lat": 41.82}, ["body", "lng"]),
+])
+def test_invalid_location_gets_the_standard_422(body, loc):
+    response = client.post("/api/tour/missing/location", json=body)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == loc
+
+
+def test_valid_location_reaches_the_handler():
+    response = client.post("/api/tour/missing/location", json={"lat": "41.82", "lng": -71.41})
+    assert response.status_code == 404
+
+
+def test_proximity_check_rejects_extra_coordinates():
+    response = client.post(
+        "/api/tour/proximity-check", json={"current_location": [1, 2, 3], "poi_location": [1, 2]}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "current_location"]
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+import pytest
+
+import services.voice as voice
+from services.voice import VoiceService
+
+AUDIO = b"\xff\xfb" + bytes(4094) + b"\xff\xfb" + bytes(4094)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(voice, "_read_cached_clip", lambda key: None)
+    monkeypatch.setattr(voice, "_write_cached_clip", lambda key, audio: None)
+    monkeypatch.setattr(VoiceService, "_inflight", {})
+    service = VoiceService()
+    service.api_key = "test-key"
+    return service
+
+
+def _mock_client(monkeypatch, requests: list, release: asyncio.Event) -> None:
+    async def handler(request):
+        requests.append(request.url.path)
+        await release.wait()
+        return httpx.Response(200, content=AUDIO)
+
+    monkeypatch.setattr(VoiceService, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_identical_streams_share_one_request(service, monkeypatch):
+    requests = []
+
+    async def run():
+        release = asyncio.Event()
+        _mock_client(monkeypatch, requests, release)
+        streams = [
+            asyncio.create_task(_collect(service.generate_audio_stream("Hello there", voice_id="v1")))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*streams)
+
+    assert asyncio.run(run()) == [AUDIO] * 3
+    assert len(requests) == 1
+    assert VoiceService._inflight == {}
+
+
+def test_abandoned_stream_lets_waiters_synthesize(service, monkeypatch):
+    requests = []
+
+    async def run():
+        release = asyncio.Event()
+        release.set()
+        _mock_client(monkeypatch, requests, release)
+
+        leader = service.generate_audio_stream("Hello there", voice_id="v1")
+        await anext(leader)
+        follower = asyncio.create_task(_collect(service.generate_audio_stream("Hello there", voice_id="v1")))
+        await asyncio.sleep(0.05)
+        assert not follower.done()
+
+        await leader.aclose()
+        return await asyncio.wait_for(follower, timeout=1)
+
+    assert asyncio.run(run()) == AUDIO
+    assert len(requests) == 2
+    assert VoiceService._inflight == {}